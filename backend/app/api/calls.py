@@ -4,17 +4,32 @@ Provides endpoints for creating, listing, and retrieving call records.
 Calls are created when a test call is triggered and updated as the call progresses.
 """
 
+import asyncio
+import base64
+import binascii
+import json
 import logging
-from typing import List, Optional
+import re
+from datetime import datetime
+from typing import Any, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from postgrest import APIError
+from postgrest.types import ReturnMethod
 from supabase import Client
 
+from app.core.constants import PG_FOREIGN_KEY_VIOLATION, PGRST_NO_ROWS
 from app.core.database import get_db
+from app.core.config_cache import (
+    get_cached_active_config,
+    set_cached_active_config,
+    invalidate_config_cache,
+)
 from app.models.schemas import (
     Call,
     CallCreate,
+    CallPage,
     CallStatus,
     CallType,
     CallWithDetails,
@@ -33,32 +48,117 @@ CALLS_TABLE = "calls"
 TRANSCRIPTS_TABLE = "transcripts"
 SUMMARIES_TABLE = "structured_summaries"
 
+# Explicit column projections (only what the response models consume)
+CALL_COLUMNS = ",".join(Call.model_fields)
+
+# Embeds related rows via the transcripts/structured_summaries -> calls foreign keys
+CALL_WITH_DETAILS_SELECT = f"*, {TRANSCRIPTS_TABLE}(*), {SUMMARIES_TABLE}(*)"
+RECENT_CALLS_SELECT = f"{CALL_COLUMNS}, {TRANSCRIPTS_TABLE}(*), {SUMMARIES_TABLE}(*)"
+
+# {{name}} placeholders in config messages
+_PLACEHOLDER_RE = re.compile(r"\{\{(\w+)\}\}")
+
+
+def _fill_placeholders(template: str, values: dict) -> str:
+    """
+    Substitute {{name}} placeholders in a single pass.
+    
+    Unknown placeholders are left as-is.
+    """
+    return _PLACEHOLDER_RE.sub(lambda m: values.get(m.group(1), m.group(0)), template)
+
+
+def _single_embed(embedded: Any) -> Optional[dict]:
+    """
+    Normalize a PostgREST embed that holds at most one row.
+    
+    One-to-many embeds come back as lists; embeds through a unique foreign
+    key (one-to-one, e.g. structured_summaries.call_id) come back as a
+    single object or null.
+    """
+    if isinstance(embedded, list):
+        return embedded[0] if embedded else None
+    return embedded or None
+
+
+def _flatten_call_details(call_data: dict) -> dict:
+    """
+    Convert embedded PostgREST rows into the singular fields of CallWithDetails.
+    
+    Each call has at most one transcript and one summary, so the first
+    entry (if any) is used.
+    """
+    transcript = _single_embed(call_data.pop(TRANSCRIPTS_TABLE, None))
+    summary = _single_embed(call_data.pop(SUMMARIES_TABLE, None))
+    return {**call_data, "transcript": transcript, "structured_summary": summary}
+
+
+def _encode_cursor(row: dict) -> str:
+    """Encode the keyset position of a call row as an opaque URL-safe cursor."""
+    payload = json.dumps({"ts": row["created_at"], "id": row["id"]})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
 
-@router.get("", response_model=List[Call])
-async def list_calls(
+
+def _decode_cursor(cursor: str) -> dict:
+    """
+    Decode a cursor produced by _encode_cursor.
+    
+    Raises 400 if the cursor is malformed.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        # Round-trip both values so only well-formed data reaches the filter string
+        return {
+            "ts": datetime.fromisoformat(position["ts"]).isoformat(),
+            "id": str(UUID(position["id"])),
+        }
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+@router.get("", response_model=CallPage)
+def list_calls(
     status_filter: Optional[CallStatus] = Query(None, alias="status", description="Filter by call status"),
     limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
-    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    offset: int = Query(0, ge=0, description="Number of results to skip (ignored when cursor is set)"),
     db: Client = Depends(get_db),
-) -> List[Call]:
+) -> CallPage:
     """
     List all calls with optional filtering and pagination.
     
-    Results are ordered by creation date (newest first).
+    Results are ordered by creation date (newest first), with id as a tiebreaker.
+    Pass the returned next_cursor to fetch the following page; keyset pagination
+    avoids scanning skipped rows. offset is kept for backwards compatibility.
     """
-    query = db.table(CALLS_TABLE).select("*")
+    query = db.table(CALLS_TABLE).select(CALL_COLUMNS)
     
     if status_filter:
         query = query.eq("status", status_filter.value)
     
-    query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
+    query = query.order("created_at", desc=True).order("id", desc=True)
+    
+    if cursor:
+        position = _decode_cursor(cursor)
+        ts, last_id = position["ts"], position["id"]
+        query = query.or_(
+            f'created_at.lt."{ts}",and(created_at.eq."{ts}",id.lt.{last_id})'
+        ).limit(limit)
+    else:
+        query = query.range(offset, offset + limit - 1)
     
     response = query.execute()
-    return response.data
+    rows = response.data
+    
+    next_cursor = _encode_cursor(rows[-1]) if len(rows) == limit else None
+    return {"data": rows, "next_cursor": next_cursor}
 
 
 @router.get("/{call_id}", response_model=CallWithDetails)
-async def get_call(
+def get_call(
     call_id: UUID,
     db: Client = Depends(get_db),
 ) -> CallWithDetails:
@@ -68,39 +168,24 @@ async def get_call(
     This endpoint returns the complete call data needed for the results view.
     Raises 404 if the call is not found.
     """
-    # Get the call
-    call_response = db.table(CALLS_TABLE).select("*").eq("id", str(call_id)).execute()
-    
-    if not call_response.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Call with id {call_id} not found"
-        )
-    
-    call_data = call_response.data[0]
-    
-    # Get related transcript
-    transcript_response = db.table(TRANSCRIPTS_TABLE).select("*").eq(
-        "call_id", str(call_id)
-    ).limit(1).execute()
-    
-    # Get related structured summary
-    summary_response = db.table(SUMMARIES_TABLE).select("*").eq(
-        "call_id", str(call_id)
-    ).limit(1).execute()
-    
-    # Build response with related data
-    result = {
-        **call_data,
-        "transcript": transcript_response.data[0] if transcript_response.data else None,
-        "structured_summary": summary_response.data[0] if summary_response.data else None,
-    }
+    # Fetch the call with its transcript and summary embedded (single round-trip)
+    try:
+        call_response = db.table(CALLS_TABLE).select(CALL_WITH_DETAILS_SELECT).eq(
+            "id", str(call_id)
+        ).single().execute()
+    except APIError as e:
+        if e.code == PGRST_NO_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Call with id {call_id} not found"
+            )
+        raise
     
-    return result
+    return _flatten_call_details(call_response.data)
 
 
 @router.post("", response_model=Call, status_code=status.HTTP_201_CREATED)
-async def create_call(
+def create_call(
     call: CallCreate,
     db: Client = Depends(get_db),
 ) -> Call:
@@ -110,24 +195,52 @@ async def create_call(
     This is called when the admin triggers a test call from the UI.
     The call starts in 'pending' status and will be updated by webhooks.
     """
-    # If agent_config_id is provided, verify it exists
-    if call.agent_config_id:
-        config_check = db.table("agent_configs").select("id").eq(
-            "id", str(call.agent_config_id)
+    # Create the call record
+    call_data = call.model_dump(mode="json")
+    if call_data.get("agent_config_id"):
+        call_data["agent_config_id"] = str(call_data["agent_config_id"])
+    
+    # The agent_config_id foreign key rejects unknown configs, so no pre-check is needed
+    try:
+        response = db.table(CALLS_TABLE).insert(
+            call_data, returning=ReturnMethod.representation
         ).execute()
-        
-        if not config_check.data:
+    except APIError as e:
+        if e.code == PG_FOREIGN_KEY_VIOLATION:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Agent configuration with id {call.agent_config_id} not found"
             )
+        raise
     
-    # Create the call record
-    call_data = call.model_dump(mode="json")
-    if call_data.get("agent_config_id"):
-        call_data["agent_config_id"] = str(call_data["agent_config_id"])
+    if not response.data:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create call record"
+        )
     
-    response = db.table(CALLS_TABLE).insert(call_data).execute()
+    return response.data[0]
+
+
+def _insert_call_record(db: Client, call_data: dict) -> dict:
+    """
+    Insert a pending call record for a triggered call and return the row.
+    
+    Raises 409 if the active config was deleted in the meantime.
+    """
+    try:
+        response = db.table(CALLS_TABLE).insert(
+            call_data, returning=ReturnMethod.representation
+        ).execute()
+    except APIError as e:
+        if e.code == PG_FOREIGN_KEY_VIOLATION:
+            # Cached active config was deleted (e.g. by another worker)
+            invalidate_config_cache()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The active configuration was removed. Please try again."
+            )
+        raise
     
     if not response.data:
         raise HTTPException(
@@ -138,9 +251,39 @@ async def create_call(
     return response.data[0]
 
 
+def _fetch_active_config(db: Client) -> Optional[dict]:
+    """Load the single active agent config, or None if none is active."""
+    response = db.table("agent_configs").select("*").eq(
+        "is_active", True
+    ).limit(1).maybe_single().execute()
+    return response.data if response is not None else None
+
+
+def _mark_call_in_progress(db: Client, call_id: str, retell_call_id: str) -> None:
+    """
+    Store Retell's call ID on our record and mark it in progress.
+    
+    Runs after the response is sent, so a call the webhooks already ended is left as is.
+    """
+    db.table(CALLS_TABLE).update({
+        "retell_call_id": retell_call_id,
+        "status": CallStatus.IN_PROGRESS.value,
+    }, returning=ReturnMethod.minimal).eq("id", call_id).in_(
+        "status", [CallStatus.PENDING.value, CallStatus.IN_PROGRESS.value]
+    ).execute()
+
+
+def _mark_call_failed(db: Client, call_id: str) -> None:
+    """Mark a call record as failed."""
+    db.table(CALLS_TABLE).update({
+        "status": CallStatus.FAILED.value,
+    }, returning=ReturnMethod.minimal).eq("id", call_id).execute()
+
+
 @router.post("/trigger", response_model=CallTriggerResponse)
 async def trigger_call(
     request: CallTriggerRequest,
+    background_tasks: BackgroundTasks,
     db: Client = Depends(get_db),
     retell: RetellService = Depends(get_retell_service),
 ) -> CallTriggerResponse:
@@ -151,49 +294,41 @@ async def trigger_call(
     It will:
     1. Get the active agent configuration for the scenario
     2. Update the Retell agent with the config's prompt
-    3. Create the call (phone or web)
-    4. Save the call record in our database
+    3. Save the call record in our database (concurrently with step 2)
+    4. Create the call (phone or web)
     
     For web calls, returns an access_token for the Retell Web SDK.
     """
     # 1. Get the single active configuration (unified config handles both scenarios)
-    config_response = db.table("agent_configs").select("*").eq(
-        "is_active", True
-    ).limit(1).execute()
+    config = get_cached_active_config()
     
-    if not config_response.data:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No active configuration found. Please activate a configuration in the Configuration page first."
-        )
-    
-    config = config_response.data[0]
+    if config is None:
+        config = await asyncio.to_thread(_fetch_active_config, db)
+        
+        if config is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No active configuration found. Please activate a configuration in the Configuration page first."
+            )
+        
+        set_cached_active_config(config)
     
     # Derive scenario_type from the active config (not from request)
     scenario_type = ScenarioType(config.get("scenario_type", ScenarioType.DISPATCH_CHECKIN.value))
     
-    # 2. Update Retell agent with config's prompt and settings (partial update)
-    # Only updates the specific fields we manage, preserving other Retell settings
-    try:
-        # Replace placeholders in initial message
-        initial_message = config.get("initial_message") or ""
-        initial_message = initial_message.replace("{{driver_name}}", request.driver_name)
-        initial_message = initial_message.replace("{{load_number}}", request.load_number)
-        
-        retell.update_agent(
-            system_prompt=config["system_prompt"],
-            initial_message=initial_message if initial_message else None,
-            enable_backchanneling=config.get("enable_backchanneling"),
-            interruption_sensitivity=config.get("interruption_sensitivity"),
-        )
-    except RetellServiceError as e:
-        logger.error(f"Failed to update Retell agent: {e}")
+    # Phone calls need a number; check before doing any I/O
+    if request.call_type == CallType.PHONE and not request.phone_number:
         raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Failed to configure Retell agent: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Phone number is required for phone calls"
         )
     
-    # 3. Create call record in our database first
+    # Replace placeholders in initial message
+    initial_message = _fill_placeholders(
+        config.get("initial_message") or "",
+        {"driver_name": request.driver_name, "load_number": request.load_number},
+    )
+    
     call_data = {
         "driver_name": request.driver_name,
         "phone_number": request.phone_number,
@@ -203,15 +338,37 @@ async def trigger_call(
         "status": CallStatus.PENDING.value,
     }
     
-    call_response = db.table(CALLS_TABLE).insert(call_data).execute()
-    
-    if not call_response.data:
+    # 2. Update Retell agent with config's prompt and settings (partial update)
+    #    Only updates the specific fields we manage, preserving other Retell settings
+    # 3. Create call record in our database
+    # These are independent, so run them concurrently (supabase-py is sync, hence the thread)
+    update_result, insert_result = await asyncio.gather(
+        retell.update_agent(
+            system_prompt=config["system_prompt"],
+            initial_message=initial_message if initial_message else None,
+            enable_backchanneling=config.get("enable_backchanneling"),
+            interruption_sensitivity=config.get("interruption_sensitivity"),
+        ),
+        asyncio.to_thread(_insert_call_record, db, call_data),
+        return_exceptions=True,
+    )
+    
+    if isinstance(update_result, RetellServiceError):
+        # Don't leave a pending record behind for a call that will never start
+        if not isinstance(insert_result, BaseException):
+            await asyncio.to_thread(_mark_call_failed, db, insert_result["id"])
+        
+        logger.error(f"Failed to update Retell agent: {update_result}")
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create call record"
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Failed to configure Retell agent: {str(update_result)}"
         )
     
-    internal_call_id = call_response.data[0]["id"]
+    for result in (update_result, insert_result):
+        if isinstance(result, BaseException):
+            raise result
+    
+    internal_call_id = insert_result["id"]
     
     # 4. Create the call via Retell API
     try:
@@ -229,29 +386,23 @@ async def trigger_call(
         
         if request.call_type == CallType.WEB:
             # Create web call (for non-USA testing)
-            retell_call = retell.create_web_call(
+            retell_call = await retell.create_web_call(
                 metadata=metadata,
                 dynamic_variables=dynamic_variables,
             )
             access_token = retell_call.access_token
         else:
             # Create phone call
-            if not request.phone_number:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Phone number is required for phone calls"
-                )
-            retell_call = retell.create_phone_call(
+            retell_call = await retell.create_phone_call(
                 to_number=request.phone_number,
                 metadata=metadata,
                 dynamic_variables=dynamic_variables,
             )
         
-        # Update our call record with Retell's call ID
-        db.table(CALLS_TABLE).update({
-            "retell_call_id": retell_call.call_id,
-            "status": CallStatus.IN_PROGRESS.value,
-        }).eq("id", internal_call_id).execute()
+        # Update our call record with Retell's call ID after the response is sent
+        background_tasks.add_task(
+            _mark_call_in_progress, db, internal_call_id, retell_call.call_id
+        )
         
         logger.info(f"Triggered {request.call_type.value} call {retell_call.call_id}")
         
@@ -264,10 +415,8 @@ async def trigger_call(
         )
         
     except RetellServiceError as e:
-        # Mark call as failed
-        db.table(CALLS_TABLE).update({
-            "status": CallStatus.FAILED.value,
-        }).eq("id", internal_call_id).execute()
+        # Inline (not a background task) so the record is failed before the client sees the error
+        await asyncio.to_thread(_mark_call_failed, db, internal_call_id)
         
         logger.error(f"Failed to create Retell call: {e}")
         raise HTTPException(
@@ -277,7 +426,7 @@ async def trigger_call(
 
 
 @router.patch("/{call_id}/status", response_model=Call)
-async def update_call_status(
+def update_call_status(
     call_id: UUID,
     new_status: CallStatus,
     db: Client = Depends(get_db),
@@ -288,30 +437,22 @@ async def update_call_status(
     This endpoint is primarily used internally by webhook handlers
     to update call status as it progresses through its lifecycle.
     """
-    # Check if call exists
-    existing = db.table(CALLS_TABLE).select("*").eq("id", str(call_id)).execute()
-    if not existing.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Call with id {call_id} not found"
-        )
-    
-    # Update status
+    # Update status; the returned representation doubles as the existence check
     response = db.table(CALLS_TABLE).update({
         "status": new_status.value
     }).eq("id", str(call_id)).execute()
     
     if not response.data:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update call status"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Call with id {call_id} not found"
         )
     
     return response.data[0]
 
 
 @router.get("/recent/completed", response_model=List[CallWithDetails])
-async def get_recent_completed_calls(
+def get_recent_completed_calls(
     limit: int = Query(10, ge=1, le=50, description="Maximum number of results"),
     db: Client = Depends(get_db),
 ) -> List[CallWithDetails]:
@@ -320,34 +461,17 @@ async def get_recent_completed_calls(
     
     This is useful for the admin dashboard to show recent call results.
     """
-    # Get recent completed calls
-    calls_response = db.table(CALLS_TABLE).select("*").eq(
+    # Fetch the calls with their transcripts and summaries embedded (single round-trip);
+    # completed calls missing ended_at are kept but sorted last
+    calls_response = db.table(CALLS_TABLE).select(RECENT_CALLS_SELECT).eq(
         "status", CallStatus.COMPLETED.value
-    ).order("ended_at", desc=True).limit(limit).execute()
-    
-    if not calls_response.data:
-        return []
-    
-    # For each call, fetch transcript and summary
-    results = []
-    for call_data in calls_response.data:
-        call_id = call_data["id"]
-        
-        # Get transcript
-        transcript_response = db.table(TRANSCRIPTS_TABLE).select("*").eq(
-            "call_id", call_id
-        ).limit(1).execute()
-        
-        # Get summary
-        summary_response = db.table(SUMMARIES_TABLE).select("*").eq(
-            "call_id", call_id
-        ).limit(1).execute()
-        
-        results.append({
-            **call_data,
-            "transcript": transcript_response.data[0] if transcript_response.data else None,
-            "structured_summary": summary_response.data[0] if summary_response.data else None,
-        })
-    
-    return results
-
+    ).order("ended_at", desc=True, nullsfirst=False).order("id", desc=True).limit(
+        limit
+    ).execute()
+    
+    # Validate (not model_construct) even though rows are trusted: it drops fields the
+    # response doesn't expose, e.g. per-word timings stored with each utterance
+    return [
+        CallWithDetails.model_validate(_flatten_call_details(row))
+        for row in calls_response.data
+    ]
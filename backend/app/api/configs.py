@@ -4,14 +4,25 @@ Provides CRUD operations for managing voice agent configurations.
 Each configuration defines prompts and Retell AI settings for a scenario.
 """
 
+import asyncio
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from postgrest import APIError
+from postgrest.types import CountMethod, ReturnMethod
 from supabase import Client
 
+from app.core.constants import PG_DEADLOCK_DETECTED, PG_UNIQUE_VIOLATION, PGRST_NO_ROWS
 from app.core.database import get_db
+from app.core.config_cache import (
+    MISSING,
+    get_cached,
+    set_cached,
+    invalidate_config_cache,
+    refresh_config_cache,
+)
 from app.models.schemas import (
     AgentConfig,
     AgentConfigCreate,
@@ -27,20 +38,79 @@ router = APIRouter(prefix="/configs", tags=["Agent Configurations"])
 # Table name constant for consistency
 TABLE_NAME = "agent_configs"
 
+# Writes one config per scenario type and activates one of them, in one transaction.
+# (Single-config writes need no function: a trigger deactivates the other configs.)
+SYNC_SCENARIOS_FN = "sync_scenario_configs"
+
+# Explicit column projection (only what AgentConfig consumes)
+CONFIG_COLUMNS = ",".join(AgentConfig.model_fields)
+
+
+def _execute_write(query):
+    """
+    Execute a config write.
+    
+    Writing an active config deactivates all others in the same statement
+    (enforce_single_active_config trigger), and activations are serialized
+    in the database. If the single-active unique index still rejects a
+    write, or Postgres aborts it as a deadlock victim, that surfaces as a
+    409 so the client can retry.
+    """
+    try:
+        return query.execute()
+    except APIError as e:
+        if e.code in (PG_UNIQUE_VIOLATION, PG_DEADLOCK_DETECTED):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Another configuration was activated at the same time. Please try again."
+            )
+        raise
+
+
+def _write_config_update(db: Client, config_id: UUID, update_data: Dict[str, Any]):
+    """
+    Apply a config update in a single statement.
+    
+    The returned rows double as the existence check.
+    """
+    return _execute_write(db.table(TABLE_NAME).update(update_data).eq("id", str(config_id)))
+
+
+async def _push_config_to_retell(retell: RetellService, config: Dict[str, Any]) -> None:
+    """Push an active config's prompt and voice settings to Retell (best effort)."""
+    try:
+        await retell.update_agent(
+            system_prompt=config.get("system_prompt"),
+            initial_message=config.get("initial_message"),
+            enable_backchanneling=config.get("enable_backchanneling"),
+            interruption_sensitivity=config.get("interruption_sensitivity"),
+        )
+        logger.info(f"Pushed active config {config.get('id')} to Retell")
+    except RetellServiceError as e:
+        logger.warning(f"Failed to push to Retell (config saved anyway): {e}")
+
 
 @router.get("", response_model=List[AgentConfig])
-async def list_configs(
+def list_configs(
     scenario_type: Optional[ScenarioType] = Query(None, description="Filter by scenario type"),
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Maximum number of results (all if omitted)"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
     db: Client = Depends(get_db),
 ) -> List[AgentConfig]:
     """
     List all agent configurations.
     
     Optionally filter by scenario_type or active status.
-    Results are ordered by creation date (newest first).
+    Results are ordered by creation date (newest first) and cached briefly.
+    Pass limit/offset to page through them; without a limit every config is returned.
     """
-    query = db.table(TABLE_NAME).select("*")
+    cache_key = ("list_configs", scenario_type, is_active, limit, offset)
+    cached = get_cached(cache_key)
+    if cached is not MISSING:
+        return cached
+    
+    query = db.table(TABLE_NAME).select(CONFIG_COLUMNS)
     
     if scenario_type:
         query = query.eq("scenario_type", scenario_type.value)
@@ -48,13 +118,18 @@ async def list_configs(
         query = query.eq("is_active", is_active)
     
     query = query.order("created_at", desc=True)
+    if limit is not None:
+        query = query.range(offset, offset + limit - 1)
+    elif offset:
+        query = query.offset(offset)
     
     response = query.execute()
+    set_cached(cache_key, response.data)
     return response.data
 
 
 @router.get("/{config_id}", response_model=AgentConfig)
-async def get_config(
+def get_config(
     config_id: UUID,
     db: Client = Depends(get_db),
 ) -> AgentConfig:
@@ -63,19 +138,21 @@ async def get_config(
     
     Raises 404 if the configuration is not found.
     """
-    response = db.table(TABLE_NAME).select("*").eq("id", str(config_id)).execute()
-    
-    if not response.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Agent configuration with id {config_id} not found"
-        )
+    try:
+        response = db.table(TABLE_NAME).select(CONFIG_COLUMNS).eq("id", str(config_id)).single().execute()
+    except APIError as e:
+        if e.code == PGRST_NO_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Agent configuration with id {config_id} not found"
+            )
+        raise
     
-    return response.data[0]
+    return response.data
 
 
 @router.post("", response_model=AgentConfig, status_code=status.HTTP_201_CREATED)
-async def create_config(
+def create_config(
     config: AgentConfigCreate,
     db: Client = Depends(get_db),
 ) -> AgentConfig:
@@ -84,11 +161,11 @@ async def create_config(
     
     If is_active is True, this will deactivate all other configs (only one active config allowed).
     """
-    # If this config should be active, deactivate all other configs (only one active config allowed)
-    if config.is_active:
-        db.table(TABLE_NAME).update({"is_active": False}).execute()
+    config_data = config.model_dump(mode="json")
     
-    response = db.table(TABLE_NAME).insert(config.model_dump(mode="json")).execute()
+    # If this config is active, the database deactivates all others in the same statement
+    # (only one active config allowed)
+    response = _execute_write(db.table(TABLE_NAME).insert(config_data))
     
     if not response.data:
         raise HTTPException(
@@ -96,6 +173,7 @@ async def create_config(
             detail="Failed to create agent configuration"
         )
     
+    refresh_config_cache(response.data[0])
     return response.data[0]
 
 
@@ -103,65 +181,49 @@ async def create_config(
 async def update_config(
     config_id: UUID,
     config: AgentConfigUpdate,
+    background_tasks: BackgroundTasks,
     db: Client = Depends(get_db),
     retell: RetellService = Depends(get_retell_service),
 ) -> AgentConfig:
     """
     Update an existing agent configuration.
     
-    Only provided fields will be updated.
+    Only provided fields will be updated; an empty payload is rejected with 400.
     If is_active is set to True, all other configs are deactivated (only one active config allowed).
-    If the config is active, changes are also pushed to Retell.
+    If the config is active, changes are also pushed to Retell in the background.
     """
-    # Check if config exists
-    existing = db.table(TABLE_NAME).select("*").eq("id", str(config_id)).execute()
-    if not existing.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Agent configuration with id {config_id} not found"
-        )
-    
-    existing_config = existing.data[0]
-    
     # Build update data (only non-None values)
     update_data = config.model_dump(exclude_none=True, mode="json")
     
     if not update_data:
-        # Nothing to update, return existing
-        return existing_config
-    
-    # If activating, deactivate ALL other configs (only one active config allowed)
-    if config.is_active:
-        db.table(TABLE_NAME).update({"is_active": False}).neq("id", str(config_id)).execute()
+        # Reject before touching the database
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No fields to update"
+        )
     
-    response = db.table(TABLE_NAME).update(update_data).eq("id", str(config_id)).execute()
+    # If activating, the database deactivates ALL other configs in the same statement
+    # (only one active config allowed). supabase-py is sync, hence the thread.
+    response = await asyncio.to_thread(_write_config_update, db, config_id, update_data)
     
     if not response.data:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update agent configuration"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Agent configuration with id {config_id} not found"
         )
     
     updated_config = response.data[0]
+    refresh_config_cache(updated_config)
     
-    # If this config is active, push changes to Retell
+    # If this config is active, push changes to Retell after the response is sent
     if updated_config.get("is_active"):
-        try:
-            retell.update_agent(
-                system_prompt=updated_config.get("system_prompt"),
-                initial_message=updated_config.get("initial_message"),
-                enable_backchanneling=updated_config.get("enable_backchanneling"),
-                interruption_sensitivity=updated_config.get("interruption_sensitivity"),
-            )
-            logger.info(f"Pushed active config {config_id} to Retell")
-        except RetellServiceError as e:
-            logger.warning(f"Failed to push to Retell (config saved anyway): {e}")
+        background_tasks.add_task(_push_config_to_retell, retell, updated_config)
     
     return updated_config
 
 
 @router.delete("/{config_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_config(
+def delete_config(
     config_id: UUID,
     db: Client = Depends(get_db),
 ) -> None:
@@ -170,19 +232,21 @@ async def delete_config(
     
     Raises 404 if the configuration is not found.
     """
-    # Check if exists
-    existing = db.table(TABLE_NAME).select("id").eq("id", str(config_id)).execute()
-    if not existing.data:
+    # Only the affected-row count comes back (no row body); zero means the config didn't exist
+    response = db.table(TABLE_NAME).delete(
+        count=CountMethod.exact, returning=ReturnMethod.minimal
+    ).eq("id", str(config_id)).execute()
+    if not response.count:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Agent configuration with id {config_id} not found"
         )
     
-    db.table(TABLE_NAME).delete().eq("id", str(config_id)).execute()
+    invalidate_config_cache()
 
 
 @router.get("/active/{scenario_type}", response_model=Optional[AgentConfig])
-async def get_active_config(
+def get_active_config(
     scenario_type: ScenarioType,
     db: Client = Depends(get_db),
 ) -> Optional[AgentConfig]:
@@ -191,74 +255,63 @@ async def get_active_config(
     
     Returns None if no active configuration exists.
     This endpoint is used when triggering calls to get the current prompts.
+    The result (including None) is cached briefly.
     """
-    response = db.table(TABLE_NAME).select("*").eq(
-        "scenario_type", scenario_type.value
-    ).eq("is_active", True).limit(1).execute()
+    cache_key = ("get_active_config", scenario_type)
+    cached = get_cached(cache_key)
+    if cached is not MISSING:
+        return cached
     
-    if not response.data:
-        return None
+    response = db.table(TABLE_NAME).select(CONFIG_COLUMNS).eq(
+        "scenario_type", scenario_type.value
+    ).eq("is_active", True).limit(1).maybe_single().execute()
     
-    return response.data[0]
+    active_config = response.data if response is not None else None
+    set_cached(cache_key, active_config)
+    return active_config
 
 
 @router.patch("/{config_id}", response_model=AgentConfig)
 async def patch_config(
     config_id: UUID,
     config: AgentConfigUpdate,
+    background_tasks: BackgroundTasks,
     db: Client = Depends(get_db),
     retell: RetellService = Depends(get_retell_service),
 ) -> AgentConfig:
     """
     Partially update an existing agent configuration.
     
-    Only provided fields will be updated.
+    Only provided fields will be updated; an empty payload is rejected with 400.
     If is_active is set to True, other configs of same scenario_type are deactivated
-    and changes are pushed to Retell.
+    and changes are pushed to Retell in the background.
     """
-    # Check if config exists
-    existing = db.table(TABLE_NAME).select("*").eq("id", str(config_id)).execute()
-    if not existing.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Agent configuration with id {config_id} not found"
-        )
-    
-    existing_config = existing.data[0]
-    
     # Build update data (only non-None values)
     update_data = config.model_dump(exclude_none=True, mode="json")
     
     if not update_data:
-        # Nothing to update, return existing
-        return existing_config
-    
-    # If activating, deactivate ALL other configs (only one active config allowed)
-    if config.is_active:
-        db.table(TABLE_NAME).update({"is_active": False}).neq("id", str(config_id)).execute()
+        # Reject before touching the database
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No fields to update"
+        )
     
-    response = db.table(TABLE_NAME).update(update_data).eq("id", str(config_id)).execute()
+    # If activating, the database deactivates ALL other configs in the same statement
+    # (only one active config allowed). supabase-py is sync, hence the thread.
+    response = await asyncio.to_thread(_write_config_update, db, config_id, update_data)
     
     if not response.data:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update agent configuration"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Agent configuration with id {config_id} not found"
         )
     
     updated_config = response.data[0]
+    refresh_config_cache(updated_config)
     
-    # If this config is active (or being activated), push changes to Retell
+    # If this config is active (or being activated), push changes to Retell after the response is sent
     if updated_config.get("is_active"):
-        try:
-            retell.update_agent(
-                system_prompt=updated_config.get("system_prompt"),
-                initial_message=updated_config.get("initial_message"),
-                enable_backchanneling=updated_config.get("enable_backchanneling"),
-                interruption_sensitivity=updated_config.get("interruption_sensitivity"),
-            )
-            logger.info(f"Pushed active config {config_id} to Retell")
-        except RetellServiceError as e:
-            logger.warning(f"Failed to push to Retell (config saved anyway): {e}")
+        background_tasks.add_task(_push_config_to_retell, retell, updated_config)
     
     return updated_config
 
@@ -267,6 +320,58 @@ async def patch_config(
 # Retell AI Sync Endpoints
 # =============================================================================
 
+def _synced_config_data(retell_config: Dict[str, Any], scenario_type: ScenarioType) -> Dict[str, Any]:
+    """Build an active config payload from Retell agent settings."""
+    return {
+        "name": retell_config.get("agent_name") or f"Synced from Retell ({scenario_type.value})",
+        "description": "Configuration synced from Retell AI dashboard",
+        "scenario_type": scenario_type.value,
+        "system_prompt": retell_config.get("general_prompt") or "",
+        "initial_message": retell_config.get("begin_message"),
+        "enable_backchanneling": retell_config.get("enable_backchannel", True),
+        "enable_filler_words": True,  # Not directly available from Retell
+        "interruption_sensitivity": retell_config.get("interruption_sensitivity", 0.5),
+        "is_active": True,
+    }
+
+
+def _resolve_sync_target(
+    db: Client,
+    scenario_type: Optional[ScenarioType],
+) -> Tuple[ScenarioType, Optional[str]]:
+    """
+    Pick the scenario type and existing config id that a Retell sync writes to.
+    
+    Returns the existing config's id, or None if a new config should be created.
+    """
+    # Determine scenario_type: use provided value, or get from active config, or use first enum value.
+    # The active config is also the sync target, so no second lookup is needed for it.
+    existing_id = None
+    if not scenario_type:
+        active_config_response = db.table(TABLE_NAME).select("id, scenario_type").eq("is_active", True).limit(1).execute()
+        if active_config_response.data:
+            scenario_type_str = active_config_response.data[0].get("scenario_type")
+            try:
+                scenario_type = ScenarioType(scenario_type_str)
+                existing_id = active_config_response.data[0]["id"]
+            except ValueError:
+                logger.warning(f"Invalid scenario_type {scenario_type_str} in active config, using first enum value")
+                scenario_type = ScenarioType.DISPATCH_CHECKIN
+        else:
+            # No active config, use first enum value
+            scenario_type = ScenarioType.DISPATCH_CHECKIN
+    
+    # Otherwise check if we have an existing config with this scenario_type
+    if existing_id is None:
+        existing = db.table(TABLE_NAME).select("id").eq(
+            "scenario_type", scenario_type.value
+        ).limit(1).execute()
+        if existing.data:
+            existing_id = existing.data[0]["id"]
+    
+    return scenario_type, existing_id
+
+
 @router.get("/retell/current")
 async def get_retell_config(
     retell: RetellService = Depends(get_retell_service),
@@ -278,7 +383,8 @@ async def get_retell_config(
     Use this to sync your local configs with what's on Retell.
     """
     try:
-        config = retell.get_agent_config()
+        # Polled by the UI: a config fetched in the last few seconds is fine
+        config = await retell.get_agent_config(use_cache=True)
         return config
     except RetellServiceError as e:
         logger.error(f"Failed to fetch Retell config: {e}")
@@ -304,53 +410,24 @@ async def sync_from_retell(
     """
     try:
         # Get current Retell config
-        retell_config = retell.get_agent_config()
+        retell_config = await retell.get_agent_config()
         
-        # Determine scenario_type: use provided value, or get from active config, or use first enum value
-        if not scenario_type:
-            active_config_response = db.table(TABLE_NAME).select("scenario_type").eq("is_active", True).limit(1).execute()
-            if active_config_response.data:
-                scenario_type_str = active_config_response.data[0].get("scenario_type")
-                try:
-                    scenario_type = ScenarioType(scenario_type_str)
-                except ValueError:
-                    logger.warning(f"Invalid scenario_type {scenario_type_str} in active config, using first enum value")
-                    scenario_type = ScenarioType.DISPATCH_CHECKIN
-            else:
-                # No active config, use first enum value
-                scenario_type = ScenarioType.DISPATCH_CHECKIN
-        
-        # Check if we have an existing config with this scenario_type
-        existing = db.table(TABLE_NAME).select("*").eq(
-            "scenario_type", scenario_type.value
-        ).limit(1).execute()
+        # Resolve the target off the event loop (supabase-py is sync)
+        scenario_type, existing_id = await asyncio.to_thread(
+            _resolve_sync_target, db, scenario_type
+        )
         
-        config_data = {
-            "name": retell_config.get("agent_name") or f"Synced from Retell ({scenario_type.value})",
-            "description": "Configuration synced from Retell AI dashboard",
-            "scenario_type": scenario_type.value,
-            "system_prompt": retell_config.get("general_prompt") or "",
-            "initial_message": retell_config.get("begin_message"),
-            "enable_backchanneling": retell_config.get("enable_backchannel", True),
-            "enable_filler_words": True,  # Not directly available from Retell
-            "interruption_sensitivity": retell_config.get("interruption_sensitivity", 0.5),
-            "is_active": True,
-        }
+        config_data = _synced_config_data(retell_config, scenario_type)
         
-        if existing.data:
+        # Write the active config; the database deactivates all others in the same
+        # statement (only one active config allowed)
+        if existing_id:
             # Update existing config
-            config_id = existing.data[0]["id"]
-            
-            # Deactivate all others first (only one active config allowed)
-            db.table(TABLE_NAME).update({"is_active": False}).neq("id", config_id).execute()
-            
-            response = db.table(TABLE_NAME).update(config_data).eq("id", config_id).execute()
+            query = db.table(TABLE_NAME).update(config_data).eq("id", existing_id)
         else:
-            # Deactivate all others first (only one active config allowed)
-            db.table(TABLE_NAME).update({"is_active": False}).execute()
-            
             # Create new config
-            response = db.table(TABLE_NAME).insert(config_data).execute()
+            query = db.table(TABLE_NAME).insert(config_data)
+        response = await asyncio.to_thread(_execute_write, query)
         
         if not response.data:
             raise HTTPException(
@@ -358,6 +435,7 @@ async def sync_from_retell(
                 detail="Failed to save synced configuration"
             )
         
+        refresh_config_cache(response.data[0])
         logger.info(f"Synced Retell config to local database for {scenario_type.value}")
         return response.data[0]
         
@@ -368,3 +446,46 @@ async def sync_from_retell(
             detail=str(e)
         )
 
+
+@router.post("/retell/sync-all", response_model=List[AgentConfig])
+async def sync_all_from_retell(
+    active_scenario: Optional[ScenarioType] = Query(None, description="Scenario whose config should be active (defaults to the currently active scenario)"),
+    db: Client = Depends(get_db),
+    retell: RetellService = Depends(get_retell_service),
+) -> List[AgentConfig]:
+    """
+    Sync configuration FROM Retell AI for every scenario type at once.
+    
+    Fetches Retell settings once and writes one config per scenario type in a
+    single database call. Only one config is active afterwards (see active_scenario).
+    """
+    try:
+        retell_config = await retell.get_agent_config()
+    except RetellServiceError as e:
+        logger.error(f"Failed to sync from Retell: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=str(e)
+        )
+    
+    payloads = [_synced_config_data(retell_config, scenario_type) for scenario_type in ScenarioType]
+    response = await asyncio.to_thread(_execute_write, db.rpc(SYNC_SCENARIOS_FN, {
+        "p_payloads": payloads,
+        "p_default_scenario": ScenarioType.DISPATCH_CHECKIN.value,
+        "p_active_scenario": active_scenario.value if active_scenario else None,
+    }))
+    
+    if not response.data:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to save synced configurations"
+        )
+    
+    active_config = next((row for row in response.data if row.get("is_active")), None)
+    if active_config:
+        refresh_config_cache(active_config)
+    else:
+        invalidate_config_cache()
+    
+    logger.info(f"Synced Retell config to local database for {len(response.data)} scenarios")
+    return response.data
@@ -1,11 +1,17 @@
 """Core configuration and utilities."""
 
 from app.core.config import get_settings, Settings
-from app.core.database import get_db, get_supabase_client
+from app.core.database import (
+    get_db,
+    get_supabase_client,
+    init_supabase_client,
+    close_supabase_client,
+)
 from app.core.constants import (
     EMERGENCY_KEYWORDS,
     ConversationState,
     STATE_TRANSITIONS,
+    TERMINAL_STATES,
     RetellEventType,
     MAX_UNCOOPERATIVE_RETRIES,
     MAX_REPEAT_REQUESTS,
@@ -17,9 +23,12 @@ __all__ = [
     "Settings",
     "get_db",
     "get_supabase_client",
+    "init_supabase_client",
+    "close_supabase_client",
     "EMERGENCY_KEYWORDS",
     "ConversationState",
     "STATE_TRANSITIONS",
+    "TERMINAL_STATES",
     "RetellEventType",
     "MAX_UNCOOPERATIVE_RETRIES",
     "MAX_REPEAT_REQUESTS",
@@ -11,12 +11,18 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
 
 
 class Settings(BaseSettings):
-    """Application settings loaded from environment variables."""
+    """
+    Application settings loaded from environment variables.
+    
+    Settings are read and validated once (see get_settings) and are
+    immutable afterwards, so the cached instance is safe to share.
+    """
     
     model_config = SettingsConfigDict(
         env_file=str(PROJECT_ROOT / ".env"),
         env_file_encoding="utf-8",
-        extra="ignore"
+        extra="ignore",
+        frozen=True,
     )
     
     # App
@@ -0,0 +1,74 @@
+"""In-process cache for agent configuration reads.
+
+Agent configs are read on every call trigger and by the configuration
+endpoints, but only change when a config is created, updated, deleted,
+or synced. Caching reads for a short TTL removes database round-trips
+from these paths; every mutation clears the cache so changes are
+visible immediately.
+
+Note: the cache is per-process. With multiple workers, each worker may
+serve stale configs for up to CONFIG_CACHE_TTL_SECONDS after a change
+made through another worker.
+
+cachetools caches aren't thread-safe (even a get can evict an expired
+entry), and the sync config endpoints run concurrently in FastAPI's
+threadpool, so every access goes through _cache_lock.
+"""
+
+import threading
+from typing import Optional, Any, Hashable, Dict
+from cachetools import TTLCache
+
+from app.core.constants import CONFIG_CACHE_TTL_SECONDS
+
+ACTIVE_CONFIG_KEY = "active_config"
+
+config_cache: TTLCache = TTLCache(maxsize=32, ttl=CONFIG_CACHE_TTL_SECONDS)
+_cache_lock = threading.Lock()
+
+# Sentinel distinguishing a cache miss from a cached None
+MISSING = object()
+
+
+def get_cached(key: Hashable) -> Any:
+    """Get a cached config read, or MISSING on a cache miss."""
+    with _cache_lock:
+        return config_cache.get(key, MISSING)
+
+
+def set_cached(key: Hashable, value: Any) -> None:
+    """Store a config read in the cache."""
+    with _cache_lock:
+        config_cache[key] = value
+
+
+def get_cached_active_config() -> Optional[Dict[str, Any]]:
+    """Get the cached active config, or None on a cache miss."""
+    with _cache_lock:
+        return config_cache.get(ACTIVE_CONFIG_KEY)
+
+
+def set_cached_active_config(config: Dict[str, Any]) -> None:
+    """Store the active config in the cache."""
+    with _cache_lock:
+        config_cache[ACTIVE_CONFIG_KEY] = config
+
+
+def invalidate_config_cache() -> None:
+    """Drop all cached config reads (call after any config mutation)."""
+    with _cache_lock:
+        config_cache.clear()
+
+
+def refresh_config_cache(written_config: Dict[str, Any]) -> None:
+    """
+    Drop all cached config reads after a write, keeping the written row
+    as the cached active config when it is active.
+    
+    The next call trigger then skips the database instead of re-reading
+    the row that was just written.
+    """
+    with _cache_lock:
+        config_cache.clear()
+        if written_config.get("is_active"):
+            config_cache[ACTIVE_CONFIG_KEY] = written_config
@@ -3,7 +3,7 @@
 Centralizes magic strings and configuration values for consistency.
 """
 
-from typing import FrozenSet
+from typing import Dict, FrozenSet, Tuple
 
 
 # =============================================================================
@@ -26,6 +26,13 @@ EMERGENCY_KEYWORDS: FrozenSet[str] = frozenset({
     "bleeding",
 })
 
+# Emergency type classification, checked in priority order (first match wins)
+EMERGENCY_TYPE_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("Accident", ("accident", "crash", "collision", "hit")),
+    ("Breakdown", ("blowout", "tire", "breakdown", "engine", "broke")),
+    ("Medical", ("medical", "ambulance", "hurt", "injured", "bleeding", "sick")),
+)
+
 # Minimum confidence threshold for emergency detection
 EMERGENCY_CONFIDENCE_THRESHOLD = 0.7
 
@@ -46,36 +53,44 @@ class ConversationState:
     FAILED = "failed"
 
 
-# Valid state transitions
-STATE_TRANSITIONS = {
-    ConversationState.INITIAL: [
+# Valid state transitions (frozensets for O(1) membership checks)
+STATE_TRANSITIONS: Dict[str, FrozenSet[str]] = {
+    ConversationState.INITIAL: frozenset({
         ConversationState.GATHERING_STATUS,
         ConversationState.EMERGENCY_DETECTED,  # Can detect emergency at any time
-    ],
-    ConversationState.GATHERING_STATUS: [
+    }),
+    ConversationState.GATHERING_STATUS: frozenset({
         ConversationState.IN_TRANSIT,
         ConversationState.ARRIVED,
         ConversationState.EMERGENCY_DETECTED,
         ConversationState.FAILED,
-    ],
-    ConversationState.IN_TRANSIT: [
+    }),
+    ConversationState.IN_TRANSIT: frozenset({
         ConversationState.COMPLETED,
         ConversationState.EMERGENCY_DETECTED,
-    ],
-    ConversationState.ARRIVED: [
+    }),
+    ConversationState.ARRIVED: frozenset({
         ConversationState.COMPLETED,
         ConversationState.EMERGENCY_DETECTED,
-    ],
-    ConversationState.EMERGENCY_DETECTED: [
+    }),
+    ConversationState.EMERGENCY_DETECTED: frozenset({
         ConversationState.ESCALATION,
-    ],
-    ConversationState.ESCALATION: [
+    }),
+    ConversationState.ESCALATION: frozenset({
         ConversationState.COMPLETED,
-    ],
-    ConversationState.COMPLETED: [],  # Terminal state
-    ConversationState.FAILED: [],  # Terminal state
+    }),
+    ConversationState.COMPLETED: frozenset(),  # Terminal state
+    ConversationState.FAILED: frozenset(),  # Terminal state
 }
 
+# Most recent utterances kept in a conversation context (older ones are dropped)
+MAX_CONTEXT_UTTERANCES = 200
+
+# States with no outgoing transitions
+TERMINAL_STATES: FrozenSet[str] = frozenset(
+    state for state, successors in STATE_TRANSITIONS.items() if not successors
+)
+
 
 # =============================================================================
 # Edge Case Handling (Task B)
@@ -88,18 +103,73 @@ MAX_UNCOOPERATIVE_RETRIES = 3
 MAX_REPEAT_REQUESTS = 2
 
 # Phrases indicating need to repeat
-UNCLEAR_RESPONSE_INDICATORS = [
+UNCLEAR_RESPONSE_INDICATORS: FrozenSet[str] = frozenset({
     "[inaudible]",
     "[unclear]",
     "...",
     "[noise]",
-]
+})
+
+# Minimal answers that count as uncooperative in very short responses
+SHORT_UNHELPFUL_RESPONSES: FrozenSet[str] = frozenset({
+    "yes",
+    "no",
+    "yeah",
+    "nah",
+    "ok",
+    "okay",
+    "fine",
+    "whatever",
+    "sure",
+})
+
+
+# =============================================================================
+# Database Client
+# =============================================================================
+
+# Timeout for PostgREST requests (seconds)
+DB_HTTP_TIMEOUT_SECONDS = 10
+
+# Opening a new connection should be quick; fail fast if the database is unreachable (seconds)
+DB_CONNECT_TIMEOUT_SECONDS = 2
+
+# Connection pool sizing for the shared Supabase client
+DB_MAX_CONNECTIONS = 50
+DB_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# Keep idle connections open longer than httpx's 5s default so sparse
+# traffic still reuses them instead of paying a new TLS handshake (seconds)
+DB_KEEPALIVE_EXPIRY_SECONDS = 300
+
+# Max wait for a free pooled connection before failing with 503 (seconds)
+DB_POOL_ACQUIRE_TIMEOUT_SECONDS = 2
+
+# Postgres error codes surfaced by PostgREST
+PG_FOREIGN_KEY_VIOLATION = "23503"
+PG_UNIQUE_VIOLATION = "23505"
+PG_DEADLOCK_DETECTED = "40P01"
+# PostgREST: .single() matched zero rows
+PGRST_NO_ROWS = "PGRST116"
+
+# How long agent config reads are cached in-process (seconds)
+CONFIG_CACHE_TTL_SECONDS = 30
 
 
 # =============================================================================
 # Retell AI Configuration
 # =============================================================================
 
+# Timeout for Retell API requests (seconds)
+RETELL_HTTP_TIMEOUT_SECONDS = 10
+
+# Connection pool sizing for the shared Retell HTTP client
+RETELL_MAX_CONNECTIONS = 40
+RETELL_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# How long a fetched Retell agent/LLM config may be served to polling reads (seconds)
+RETELL_CONFIG_CACHE_TTL_SECONDS = 30
+
 # Webhook event types from Retell AI
 class RetellEventType:
     """Retell AI webhook event types."""
@@ -107,3 +177,40 @@ class RetellEventType:
     CALL_ENDED = "call_ended"
     CALL_ANALYZED = "call_analyzed"
 
+# Call lookups (retell_call_id -> our call) cached across a call's webhooks;
+# call_analyzed usually arrives within minutes of call_ended
+WEBHOOK_CALL_CACHE_TTL_SECONDS = 3600
+WEBHOOK_CALL_CACHE_MAX_ENTRIES = 1024
+
+# Processed (retell_call_id, event) pairs remembered so Retell's redeliveries
+# are answered without re-running the handler
+WEBHOOK_DEDUP_TTL_SECONDS = 3600
+WEBHOOK_DEDUP_MAX_ENTRIES = 4096
+
+# Webhook bodies at least this large are parsed and validated on a worker
+# thread (~1ms of work at 64KB); smaller ones aren't worth the thread hop
+WEBHOOK_PARSE_OFFLOAD_BYTES = 64 * 1024
+
+
+# =============================================================================
+# OpenAI Extraction
+# =============================================================================
+
+# Max concurrent OpenAI requests when extracting many transcripts at once
+OPENAI_MAX_CONCURRENT_EXTRACTIONS = 10
+
+# Output cap for one extraction: the JSON for either schema is well under 300
+# tokens, so this only cuts off runaway generations
+OPENAI_EXTRACTION_MAX_TOKENS = 400
+
+# Successful extractions are cached by transcript hash so redelivered
+# call_analyzed webhooks don't repeat the OpenAI request
+EXTRACTION_CACHE_TTL_SECONDS = 3600
+EXTRACTION_CACHE_MAX_ENTRIES = 256
+
+# Long dispatch check-in transcripts are sent as head + tail: the opening sets
+# the context and the closing turns carry the final status and ETA. Emergency
+# transcripts are always sent in full.
+TRANSCRIPT_TRIM_THRESHOLD_CHARS = 8000
+TRANSCRIPT_TRIM_HEAD_CHARS = 2000
+TRANSCRIPT_TRIM_TAIL_CHARS = 4000
@@ -1,24 +1,96 @@
 """Supabase database client configuration."""
 
-from functools import lru_cache
+import logging
+from typing import Optional
+
+import httpx
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
 
 from app.core.config import get_settings
+from app.core.constants import (
+    DB_CONNECT_TIMEOUT_SECONDS,
+    DB_HTTP_TIMEOUT_SECONDS,
+    DB_MAX_CONNECTIONS,
+    DB_MAX_KEEPALIVE_CONNECTIONS,
+    DB_KEEPALIVE_EXPIRY_SECONDS,
+    DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+)
 
+logger = logging.getLogger(__name__)
 
-@lru_cache
-def get_supabase_client() -> Client:
+# Shared client (one connection pool for all requests)
+_client: Optional[Client] = None
+_http_client: Optional[httpx.Client] = None
+
+
+def init_supabase_client() -> Client:
     """
-    Get cached Supabase client instance.
+    Create the shared Supabase client if it doesn't exist yet.
     
     Uses service role key for full database access.
-    The client is cached to avoid creating multiple connections.
+    All PostgREST requests go through a single pooled httpx client,
+    so TLS connections are reused across requests. HTTP/2 lets
+    concurrent requests multiplex over one connection. Waiting for a
+    free connection is bounded, so an exhausted pool fails fast
+    (httpx.PoolTimeout) instead of queueing requests indefinitely.
+    """
+    global _client, _http_client
+    if _client is None:
+        settings = get_settings()
+        _http_client = httpx.Client(
+            http2=True,
+            timeout=httpx.Timeout(
+                DB_HTTP_TIMEOUT_SECONDS,
+                connect=DB_CONNECT_TIMEOUT_SECONDS,
+                pool=DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=DB_MAX_CONNECTIONS,
+                max_keepalive_connections=DB_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=DB_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+        _client = create_client(
+            settings.supabase_url,
+            settings.supabase_service_role_key,
+            options=SyncClientOptions(schema="public", httpx_client=_http_client),
+        )
+    return _client
+
+
+def check_database_connection() -> bool:
+    """
+    Issue a trivial query to verify the database is reachable.
+    
+    Also warms up the connection pool so the first real request
+    doesn't pay the TLS handshake.
     """
-    settings = get_settings()
-    return create_client(
-        settings.supabase_url,
-        settings.supabase_service_role_key
-    )
+    try:
+        get_supabase_client().table("agent_configs").select("id").limit(1).execute()
+        return True
+    except Exception as e:
+        logger.warning(f"Database health check failed: {e}")
+        return False
+
+
+def close_supabase_client() -> None:
+    """Close the shared client's connection pool (called on app shutdown)."""
+    global _client, _http_client
+    if _http_client is not None:
+        _http_client.close()
+    _client = None
+    _http_client = None
+
+
+def get_supabase_client() -> Client:
+    """
+    Get the shared Supabase client instance.
+    
+    The client is normally created at app startup; it is created lazily
+    here for code paths that run outside the app lifespan.
+    """
+    return _client or init_supabase_client()
 
 
 def get_db() -> Client:
@@ -31,4 +103,3 @@ def get_db() -> Client:
             ...
     """
     return get_supabase_client()
-
@@ -6,18 +6,61 @@ Handles state transitions during a call, including:
 - Edge case handling (uncooperative driver, noisy environment)
 """
 
-from typing import Optional, List, Tuple
-from dataclasses import dataclass, field
+import logging
+import re
+from collections import deque
+from typing import Optional, Tuple, Iterable, Deque
+from dataclasses import dataclass, field, fields
 
 from app.core.constants import (
     ConversationState,
     STATE_TRANSITIONS,
+    TERMINAL_STATES,
+    MAX_CONTEXT_UTTERANCES,
     EMERGENCY_KEYWORDS,
+    EMERGENCY_TYPE_KEYWORDS,
     MAX_UNCOOPERATIVE_RETRIES,
     MAX_REPEAT_REQUESTS,
     UNCLEAR_RESPONSE_INDICATORS,
+    SHORT_UNHELPFUL_RESPONSES,
 )
 
+logger = logging.getLogger(__name__)
+
+
+def _compile_keywords(keywords: Iterable[str]) -> "re.Pattern[str]":
+    """Compile literal keywords into one alternation (substring match, one pass)."""
+    return re.compile("|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+
+
+# Compiled once at import; patterns match against lowercased text
+_EMERGENCY_RE = _compile_keywords(EMERGENCY_KEYWORDS)
+_EMERGENCY_TYPE_RES = tuple(
+    (emergency_type, _compile_keywords(words)) for emergency_type, words in EMERGENCY_TYPE_KEYWORDS
+)
+_UNCLEAR_RE = _compile_keywords(UNCLEAR_RESPONSE_INDICATORS)
+
+
+def _classify_emergency(text_lower: str) -> str:
+    """Classify the type of emergency based on (lowercased) text content."""
+    for emergency_type, pattern in _EMERGENCY_TYPE_RES:
+        if pattern.search(text_lower):
+            return emergency_type
+    return "Other"
+
+
+def detect_emergency(text: str) -> Optional[str]:
+    """
+    Check text for emergency indicators without building a state machine.
+    
+    Returns:
+        The emergency type if an emergency is indicated, else None
+    """
+    text_lower = text.lower()
+    if _EMERGENCY_RE.search(text_lower):
+        return _classify_emergency(text_lower)
+    return None
+
 
 @dataclass
 class ConversationContext:
@@ -45,8 +88,32 @@ class ConversationContext:
     uncooperative_count: int = 0
     repeat_request_count: int = 0
     
-    # Conversation history
-    utterances: List[dict] = field(default_factory=list)
+    # Conversation history (bounded: only the most recent utterances are kept)
+    utterances: Deque[dict] = field(default_factory=lambda: deque(maxlen=MAX_CONTEXT_UTTERANCES))
+    # Older utterances dropped from the history once the bound was reached
+    dropped_utterances: int = 0
+    
+    def __post_init__(self):
+        """Bound utterances passed in as a plain list (e.g. from storage)."""
+        if not isinstance(self.utterances, deque) or self.utterances.maxlen != MAX_CONTEXT_UTTERANCES:
+            utterances = list(self.utterances or ())
+            excess = len(utterances) - MAX_CONTEXT_UTTERANCES
+            if excess > 0:
+                self.record_dropped_utterances(excess)
+            self.utterances = deque(utterances, maxlen=MAX_CONTEXT_UTTERANCES)
+    
+    def record_dropped_utterances(self, count: int) -> None:
+        """Count utterances dropped by the history bound, warning the first time."""
+        if not self.dropped_utterances:
+            logger.warning(
+                f"Conversation history reached {MAX_CONTEXT_UTTERANCES} utterances; "
+                "older utterances are being dropped"
+            )
+        self.dropped_utterances += count
+
+
+# Field names in declaration order, used for (de)serialization
+_CONTEXT_FIELDS = tuple(f.name for f in fields(ConversationContext))
 
 
 class StateMachine:
@@ -64,9 +131,7 @@ class StateMachine:
     
     def can_transition(self, new_state: str) -> bool:
         """Check if transition to new_state is valid from current state."""
-        current = self.context.state
-        valid_transitions = STATE_TRANSITIONS.get(current, [])
-        return new_state in valid_transitions
+        return new_state in STATE_TRANSITIONS.get(self.context.state, ())
     
     def transition(self, new_state: str) -> bool:
         """
@@ -87,26 +152,8 @@ class StateMachine:
         Returns:
             Tuple of (is_emergency, emergency_type)
         """
-        text_lower = text.lower()
-        
-        for keyword in EMERGENCY_KEYWORDS:
-            if keyword in text_lower:
-                # Determine emergency type
-                emergency_type = self._classify_emergency(text_lower)
-                return True, emergency_type
-        
-        return False, None
-    
-    def _classify_emergency(self, text: str) -> str:
-        """Classify the type of emergency based on text content."""
-        if any(word in text for word in ["accident", "crash", "collision", "hit"]):
-            return "Accident"
-        elif any(word in text for word in ["blowout", "tire", "breakdown", "engine", "broke"]):
-            return "Breakdown"
-        elif any(word in text for word in ["medical", "ambulance", "hurt", "injured", "bleeding", "sick"]):
-            return "Medical"
-        else:
-            return "Other"
+        emergency_type = detect_emergency(text)
+        return emergency_type is not None, emergency_type
     
     def handle_emergency(self, text: str) -> bool:
         """
@@ -127,8 +174,7 @@ class StateMachine:
     
     def is_unclear_response(self, text: str) -> bool:
         """Check if the response indicates audio/speech issues."""
-        text_lower = text.lower()
-        return any(indicator in text_lower for indicator in UNCLEAR_RESPONSE_INDICATORS)
+        return bool(_UNCLEAR_RE.search(text.lower()))
     
     def handle_unclear_response(self) -> Tuple[bool, str]:
         """
@@ -147,10 +193,8 @@ class StateMachine:
     def is_uncooperative_response(self, text: str) -> bool:
         """Check if response is minimal/uncooperative (one-word answers, etc.)."""
         # Very short responses that don't provide useful information
-        words = text.strip().split()
-        short_unhelpful = ["yes", "no", "yeah", "nah", "ok", "okay", "fine", "whatever", "sure"]
-        
-        return len(words) <= 2 and any(word.lower() in short_unhelpful for word in words)
+        words = text.strip().lower().split()
+        return len(words) <= 2 and not SHORT_UNHELPFUL_RESPONSES.isdisjoint(words)
     
     def handle_uncooperative_response(self) -> Tuple[bool, str]:
         """
@@ -175,6 +219,8 @@ class StateMachine:
     
     def add_utterance(self, role: str, content: str) -> None:
         """Add an utterance to the conversation history."""
+        if len(self.context.utterances) == MAX_CONTEXT_UTTERANCES:
+            self.context.record_dropped_utterances(1)
         self.context.utterances.append({
             "role": role,
             "content": content,
@@ -186,52 +232,18 @@ class StateMachine:
     
     def is_terminal(self) -> bool:
         """Check if conversation is in a terminal state."""
-        return self.context.state in [
-            ConversationState.COMPLETED,
-            ConversationState.FAILED,
-        ]
+        return self.context.state in TERMINAL_STATES
     
     def to_dict(self) -> dict:
         """Serialize context to dictionary for storage."""
-        return {
-            "state": self.context.state,
-            "driver_status": self.context.driver_status,
-            "current_location": self.context.current_location,
-            "eta": self.context.eta,
-            "delay_reason": self.context.delay_reason,
-            "unloading_status": self.context.unloading_status,
-            "pod_acknowledged": self.context.pod_acknowledged,
-            "is_emergency": self.context.is_emergency,
-            "emergency_type": self.context.emergency_type,
-            "safety_status": self.context.safety_status,
-            "injury_status": self.context.injury_status,
-            "emergency_location": self.context.emergency_location,
-            "load_secure": self.context.load_secure,
-            "uncooperative_count": self.context.uncooperative_count,
-            "repeat_request_count": self.context.repeat_request_count,
-            "utterances": self.context.utterances,
-        }
+        data = {name: getattr(self.context, name) for name in _CONTEXT_FIELDS}
+        data["utterances"] = list(self.context.utterances)
+        return data
     
     @classmethod
     def from_dict(cls, data: dict) -> "StateMachine":
-        """Deserialize state machine from dictionary."""
+        """Deserialize state machine from dictionary (unknown keys are ignored)."""
         context = ConversationContext(
-            state=data.get("state", ConversationState.INITIAL),
-            driver_status=data.get("driver_status"),
-            current_location=data.get("current_location"),
-            eta=data.get("eta"),
-            delay_reason=data.get("delay_reason"),
-            unloading_status=data.get("unloading_status"),
-            pod_acknowledged=data.get("pod_acknowledged", False),
-            is_emergency=data.get("is_emergency", False),
-            emergency_type=data.get("emergency_type"),
-            safety_status=data.get("safety_status"),
-            injury_status=data.get("injury_status"),
-            emergency_location=data.get("emergency_location"),
-            load_secure=data.get("load_secure"),
-            uncooperative_count=data.get("uncooperative_count", 0),
-            repeat_request_count=data.get("repeat_request_count", 0),
-            utterances=data.get("utterances", []),
+            **{name: value for name, value in data.items() if name in _CONTEXT_FIELDS}
         )
         return cls(context)
-
@@ -1,11 +1,22 @@
 """FastAPI application entry point."""
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+import httpx
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.core.config import get_settings
+from app.core.database import (
+    init_supabase_client,
+    check_database_connection,
+    close_supabase_client,
+)
+from app.services.retell import get_retell_service, close_retell_service
+from app.services.openai_service import get_openai_service, close_openai_service
 from app.api.router import api_router
 from app.webhooks import retell_router
 
@@ -15,15 +26,48 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared clients on startup and release them on shutdown."""
+    init_supabase_client()
+    # Build the shared clients and warm their connection pools concurrently
+    # (DNS + TLS) so the first call trigger or extraction doesn't pay the handshakes
+    db_ok, retell_ok, openai_ok = await asyncio.gather(
+        asyncio.to_thread(check_database_connection),
+        get_retell_service().warm_up(),
+        get_openai_service().warm_up(),
+    )
+    if db_ok:
+        logger.info("Database connection established")
+    if retell_ok:
+        logger.info("Retell connection established")
+    if openai_ok:
+        logger.info("OpenAI connection established")
+    
+    yield
+    
+    close_supabase_client()
+    await close_retell_service()
+    await close_openai_service()
+
+
 app = FastAPI(
     title=settings.app_name,
     description="AI Voice Agent for logistics dispatch calls",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
-# CORS middleware
+# Middleware (outermost first): CORS.
+# CORSMiddleware is pure ASGI and answers preflight OPTIONS requests before
+# routing. Write any new middleware as a pure ASGI class
+# (__call__(scope, receive, send)); BaseHTTPMiddleware adds a task and
+# body buffering to every request.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[settings.frontend_url],
@@ -32,6 +76,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(httpx.PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: httpx.PoolTimeout) -> JSONResponse:
+    """Shed load when every pooled database connection is busy."""
+    logger.warning(f"Connection pool exhausted on {request.url.path}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 # Include API routes
 app.include_router(api_router)
 
@@ -8,6 +8,9 @@ from app.models.schemas import (
     CallOutcome,
     DriverStatus,
     EmergencyType,
+    CALL_OUTCOMES,
+    DRIVER_STATUSES,
+    EMERGENCY_TYPES,
     # Agent Config
     AgentConfig,
     AgentConfigCreate,
@@ -33,6 +36,9 @@ __all__ = [
     "CallOutcome",
     "DriverStatus",
     "EmergencyType",
+    "CALL_OUTCOMES",
+    "DRIVER_STATUSES",
+    "EMERGENCY_TYPES",
     "AgentConfig",
     "AgentConfigCreate",
     "AgentConfigUpdate",
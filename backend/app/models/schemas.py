@@ -8,10 +8,11 @@ These models map directly to the database schema and provide:
 
 from datetime import datetime
 from enum import Enum
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Literal, get_args
 from uuid import UUID
 
 from pydantic import BaseModel, Field, ConfigDict
+from typing_extensions import Annotated, NotRequired, TypedDict
 
 
 # =============================================================================
@@ -38,27 +39,21 @@ class CallType(str, Enum):
     WEB = "web"
 
 
-class CallOutcome(str, Enum):
-    """Possible call outcomes for structured summary."""
-    IN_TRANSIT_UPDATE = "In-Transit Update"
-    ARRIVAL_CONFIRMATION = "Arrival Confirmation"
-    EMERGENCY_ESCALATION = "Emergency Escalation"
+# Summary-only categories are Literal aliases rather than Enums: they are
+# never referenced by member, and Literal fields serialize faster when
+# hydrating many summaries. The frozensets are for runtime membership checks.
 
+# Possible call outcomes for structured summary
+CallOutcome = Literal["In-Transit Update", "Arrival Confirmation", "Emergency Escalation"]
+CALL_OUTCOMES = frozenset(get_args(CallOutcome))
 
-class DriverStatus(str, Enum):
-    """Driver status options for dispatch check-in."""
-    DRIVING = "Driving"
-    DELAYED = "Delayed"
-    ARRIVED = "Arrived"
-    UNLOADING = "Unloading"
+# Driver status options for dispatch check-in
+DriverStatus = Literal["Driving", "Delayed", "Arrived", "Unloading"]
+DRIVER_STATUSES = frozenset(get_args(DriverStatus))
 
-
-class EmergencyType(str, Enum):
-    """Emergency type classification."""
-    ACCIDENT = "Accident"
-    BREAKDOWN = "Breakdown"
-    MEDICAL = "Medical"
-    OTHER = "Other"
+# Emergency type classification
+EmergencyType = Literal["Accident", "Breakdown", "Medical", "Other"]
+EMERGENCY_TYPES = frozenset(get_args(EmergencyType))
 
 
 # =============================================================================
@@ -153,11 +148,15 @@ class Call(CallBase):
 # Transcript Models
 # =============================================================================
 
-class Utterance(BaseModel):
+# A TypedDict rather than a model: transcripts hold hundreds of utterances,
+# and validating them as plain dicts is several times faster than building a
+# model instance per utterance. Unknown keys (e.g. per-word timings) are
+# still dropped and timestamp still defaults to None.
+class Utterance(TypedDict):
     """Single utterance in a conversation."""
     role: str  # "agent" or "user"
     content: str
-    timestamp: Optional[float] = None
+    timestamp: NotRequired[Annotated[Optional[float], Field(default=None)]]
 
 
 class TranscriptBase(BaseModel):
@@ -235,6 +234,12 @@ class CallWithDetails(Call):
     structured_summary: Optional[StructuredSummary] = None
 
 
+class CallPage(BaseModel):
+    """Keyset-paginated list of calls."""
+    data: List[Call]
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page (None on the last page)")
+
+
 class PaginatedResponse(BaseModel):
     """Generic paginated response wrapper."""
     items: List[Any]
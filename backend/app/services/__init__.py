@@ -1,29 +1,40 @@
 """
 Business logic services.
+
+Exports are resolved lazily (PEP 562): importing one submodule, such as
+app.services.fallback_extraction, doesn't pull in the Retell and OpenAI SDKs.
 """
 
-from app.services.retell import (
-    RetellService,
-    RetellServiceError,
-    get_retell_service,
-)
-from app.services.openai_service import (
-    OpenAIService,
-    OpenAIServiceError,
-    get_openai_service,
-)
-from app.services.post_processing import (
-    PostProcessingService,
-    get_post_processing_service,
-)
-
-__all__ = [
-    "RetellService",
-    "RetellServiceError",
-    "get_retell_service",
-    "OpenAIService",
-    "OpenAIServiceError",
-    "get_openai_service",
-    "PostProcessingService",
-    "get_post_processing_service",
-]
+from importlib import import_module
+from typing import Any
+
+# Exported name -> submodule that defines it
+_EXPORTS = {
+    "RetellService": "app.services.retell",
+    "RetellServiceError": "app.services.retell",
+    "get_retell_service": "app.services.retell",
+    "close_retell_service": "app.services.retell",
+    "OpenAIService": "app.services.openai_service",
+    "OpenAIServiceError": "app.services.openai_service",
+    "get_openai_service": "app.services.openai_service",
+    "close_openai_service": "app.services.openai_service",
+    "PostProcessingService": "app.services.post_processing",
+    "get_post_processing_service": "app.services.post_processing",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    """Import the defining submodule on first access to an export."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """Include lazy exports in dir() and tab completion."""
+    return sorted(set(globals()) | set(__all__))
@@ -24,25 +24,146 @@ from typing import Dict, Any, Optional
 logger = logging.getLogger(__name__)
 
 
+# Precompiled patterns (matched against lowercased transcripts)
+#
+# Each categorical field is one fused pattern with a named group per value,
+# listed in priority order. _match_category scans the transcript once and
+# returns the highest-priority value found, so "arrived" still wins over an
+# earlier "driving" exactly as the old one-search-per-value chain did.
+_DRIVER_STATUS_RE = re.compile(
+    r"\b(?:"
+    r"(?P<arrived>arrived|just got here|pulled in|at the destination|made it here)"
+    r"|(?P<unloading>unloading|in door|at the dock|unloading now)"
+    r"|(?P<delayed>delayed|running late|behind schedule|running behind)"
+    r"|(?P<driving>driving|on the road|still driving|en route|on the way)"
+    r")\b"
+)
+_DRIVER_STATUS_VALUES = {
+    "arrived": "Arrived",
+    "unloading": "Unloading",
+    "delayed": "Delayed",
+    "driving": "Driving",
+}
+
+_EMERGENCY_TYPE_RE = re.compile(
+    r"\b(?:"
+    r"(?P<accident>accident|crash|collision|wreck|hit something)"
+    r"|(?P<breakdown>breakdown|broke down|blowout|tire|mechanical issue|engine problem)"
+    r"|(?P<medical>medical|sick|ambulance|need medical|having a medical)"
+    # "Other" only when it's clearly an emergency but can't be classified further
+    r"|(?P<other>emergency|need help|something wrong|pulling over|stopping)"
+    r")\b"
+)
+_EMERGENCY_TYPE_VALUES = {
+    "accident": "Accident",
+    "breakdown": "Breakdown",
+    "medical": "Medical",
+    "other": "Other",
+}
+
+_EMERGENCY_ESCALATION_RE = re.compile(r"\b(emergency|accident|breakdown|medical|help|escalat)\b")
+
+_CALL_OUTCOME_RE = re.compile(
+    r"\b(?:"
+    r"(?P<arrival>arrived|just got here|pulled in|at the destination|made it)"
+    r"|(?P<in_transit>driving|in transit|on the way|en route|still driving)"
+    r")\b"
+)
+_CALL_OUTCOME_VALUES = {
+    "arrival": "Arrival Confirmation",
+    "in_transit": "In-Transit Update",
+}
+
+# Negative patterns come first (more specific); the positive "secure" needs
+# its own \b so it doesn't match inside "not secure"
+_LOAD_SECURE_RE = re.compile(
+    r"\b(?:"
+    r"(?P<not_secure>load\s+(?:is\s+)?not\s+secure|load\s+(?:is\s+)?loose|load\s+shifted|load\s+(?:is\s+)?moving|not\s+secure)"
+    r"|(?P<secure>load\s+(?:is\s+)?secure\b|load\s+(?:is\s+)?fine|load\s+(?:is\s+)?good|no\s+(?:problem|issue))"
+    r")\b"
+)
+_LOAD_SECURE_VALUES = {"not_secure": False, "secure": True}
+
+_POD_MENTION_RE = re.compile(r"\b(pod|proof of delivery|remember to get|don't forget.*pod)\b")
+# Positive acknowledgment takes priority over negative
+_POD_ACK_RE = re.compile(
+    r"\b(?:"
+    r"(?P<yes>yes|got it|will do|sure|okay|ok|i will|absolutely|definitely)"
+    r"|(?P<no>no|forgot|didn't|won't|can't)"
+    r")\b"
+)
+_POD_ACK_VALUES = {"yes": True, "no": False}
+
+
+def _match_category(pattern: re.Pattern, transcript_lower: str, values: Dict[str, Any]) -> Any:
+    """
+    Scan once with a fused pattern and return the value for the
+    highest-priority group that matched, or None.
+    
+    Group numbers follow the order groups appear in the pattern, which is
+    the priority order. Stops early once the top-priority group matches.
+    """
+    best_rank = None
+    best_name = None
+    for match in pattern.finditer(transcript_lower):
+        rank = pattern.groupindex[match.lastgroup]
+        if best_rank is None or rank < best_rank:
+            best_rank, best_name = rank, match.lastgroup
+            if rank == 1:
+                break
+    return values[best_name] if best_name is not None else None
+
+
+# =============================================================================
+# Extractors
+# =============================================================================
+# Each public extractor accepts raw transcript text; the underscore variants
+# take text that is already lowercased, so fill_missing_categorical_fields
+# lowercases the transcript at most once for all fields (or reuses the
+# caller's lowercased copy).
+
+
+def _driver_status(transcript_lower: str) -> Optional[str]:
+    """driver_status from a lowercased transcript."""
+    return _match_category(_DRIVER_STATUS_RE, transcript_lower, _DRIVER_STATUS_VALUES)
+
+
+def _emergency_type(transcript_lower: str) -> Optional[str]:
+    """emergency_type from a lowercased transcript."""
+    return _match_category(_EMERGENCY_TYPE_RE, transcript_lower, _EMERGENCY_TYPE_VALUES)
+
+
+def _call_outcome(transcript_lower: str, is_emergency: bool) -> Optional[str]:
+    """call_outcome from a lowercased transcript."""
+    if is_emergency:
+        if _EMERGENCY_ESCALATION_RE.search(transcript_lower):
+            return "Emergency Escalation"
+        return None
+    
+    return _match_category(_CALL_OUTCOME_RE, transcript_lower, _CALL_OUTCOME_VALUES)
+
+
+def _load_secure(transcript_lower: str) -> Optional[bool]:
+    """load_secure from a lowercased transcript."""
+    return _match_category(_LOAD_SECURE_RE, transcript_lower, _LOAD_SECURE_VALUES)
+
+
+def _pod_reminder_acknowledged(transcript_lower: str) -> Optional[bool]:
+    """pod_reminder_acknowledged from a lowercased transcript."""
+    # Check if POD was mentioned
+    if not _POD_MENTION_RE.search(transcript_lower):
+        return None
+    
+    return _match_category(_POD_ACK_RE, transcript_lower, _POD_ACK_VALUES)
+
+
 def extract_driver_status(transcript: str) -> Optional[str]:
     """
     Extract driver_status using high-confidence patterns.
     
     Returns one of: "Driving", "Delayed", "Arrived", "Unloading", or None
     """
-    transcript_lower = transcript.lower()
-    
-    # High-confidence patterns
-    if re.search(r"\b(arrived|just got here|pulled in|at the destination|made it here)\b", transcript_lower):
-        return "Arrived"
-    elif re.search(r"\b(unloading|in door|at the dock|unloading now)\b", transcript_lower):
-        return "Unloading"
-    elif re.search(r"\b(delayed|running late|behind schedule|running behind)\b", transcript_lower):
-        return "Delayed"
-    elif re.search(r"\b(driving|on the road|still driving|en route|on the way)\b", transcript_lower):
-        return "Driving"
-    
-    return None
+    return _driver_status(transcript.lower())
 
 
 def extract_emergency_type(transcript: str) -> Optional[str]:
@@ -51,21 +172,7 @@ def extract_emergency_type(transcript: str) -> Optional[str]:
     
     Returns one of: "Accident", "Breakdown", "Medical", "Other", or None
     """
-    transcript_lower = transcript.lower()
-    
-    # High-confidence patterns
-    if re.search(r"\b(accident|crash|collision|wreck|hit something)\b", transcript_lower):
-        return "Accident"
-    elif re.search(r"\b(breakdown|broke down|blowout|tire|mechanical issue|engine problem)\b", transcript_lower):
-        return "Breakdown"
-    elif re.search(r"\b(medical|sick|ambulance|need medical|having a medical)\b", transcript_lower):
-        return "Medical"
-    elif re.search(r"\b(emergency|need help|something wrong|pulling over|stopping)\b", transcript_lower):
-        # Only return "Other" if we have high confidence it's an emergency
-        # but can't classify it further
-        return "Other"
-    
-    return None
+    return _emergency_type(transcript.lower())
 
 
 def extract_call_outcome(transcript: str, is_emergency: bool = False) -> Optional[str]:
@@ -78,19 +185,7 @@ def extract_call_outcome(transcript: str, is_emergency: bool = False) -> Optiona
         
     Returns one of: "In-Transit Update", "Arrival Confirmation", "Emergency Escalation", or None
     """
-    if is_emergency:
-        if re.search(r"\b(emergency|accident|breakdown|medical|help|escalat)\b", transcript.lower()):
-            return "Emergency Escalation"
-        return None
-    
-    transcript_lower = transcript.lower()
-    
-    if re.search(r"\b(arrived|just got here|pulled in|at the destination|made it)\b", transcript_lower):
-        return "Arrival Confirmation"
-    elif re.search(r"\b(driving|in transit|on the way|en route|still driving)\b", transcript_lower):
-        return "In-Transit Update"
-    
-    return None
+    return _call_outcome(transcript.lower(), is_emergency)
 
 
 def extract_load_secure(transcript: str) -> Optional[bool]:
@@ -99,17 +194,7 @@ def extract_load_secure(transcript: str) -> Optional[bool]:
     
     Returns True, False, or None if uncertain
     """
-    transcript_lower = transcript.lower()
-    
-    # Check negative patterns FIRST (more specific)
-    if re.search(r"\b(load\s+(?:is\s+)?not\s+secure|load\s+(?:is\s+)?loose|load\s+shifted|load\s+(?:is\s+)?moving|not\s+secure)\b", transcript_lower):
-        return False
-    
-    # Then check positive patterns (but avoid matching "secure" in "not secure")
-    if re.search(r"\b(load\s+(?:is\s+)?secure\b|load\s+(?:is\s+)?fine|load\s+(?:is\s+)?good|no\s+(?:problem|issue))\b", transcript_lower):
-        return True
-    
-    return None
+    return _load_secure(transcript.lower())
 
 
 def extract_pod_reminder_acknowledged(transcript: str) -> Optional[bool]:
@@ -118,27 +203,33 @@ def extract_pod_reminder_acknowledged(transcript: str) -> Optional[bool]:
     
     Returns True, False, or None if uncertain
     """
-    transcript_lower = transcript.lower()
-    
-    # Check if POD was mentioned
-    if not re.search(r"\b(pod|proof of delivery|remember to get|don't forget.*pod)\b", transcript_lower):
-        return None
-    
-    # Positive acknowledgment patterns
-    if re.search(r"\b(yes|got it|will do|sure|okay|ok|i will|absolutely|definitely)\b", transcript_lower):
-        return True
-    
-    # Negative acknowledgment patterns
-    if re.search(r"\b(no|forgot|didn't|won't|can't)\b", transcript_lower):
-        return False
-    
-    return None
+    return _pod_reminder_acknowledged(transcript.lower())
+
+
+# Fields the fallback can fill per scenario, as (categorical, boolean).
+# Categorical fields count as missing when falsy, booleans only when None.
+_FALLBACK_FIELDS = {
+    "emergency": (("emergency_type", "call_outcome"), ("load_secure",)),
+    "dispatch_checkin": (("driver_status", "call_outcome"), ("pod_reminder_acknowledged",)),
+}
+
+
+def _has_all_fallback_fields(extracted_data: Dict[str, Any], scenario_type: str) -> bool:
+    """Whether every field the fallback could fill is already present."""
+    categorical, boolean = _FALLBACK_FIELDS[
+        "emergency" if scenario_type == "emergency" else "dispatch_checkin"
+    ]
+    return (
+        all(extracted_data.get(field) for field in categorical)
+        and all(extracted_data.get(field) is not None for field in boolean)
+    )
 
 
 def fill_missing_categorical_fields(
     extracted_data: Dict[str, Any],
     transcript: str,
     scenario_type: str,
+    transcript_lower: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Fill only missing categorical fields using limited regex fallback.
@@ -150,30 +241,37 @@ def fill_missing_categorical_fields(
         extracted_data: Data extracted by OpenAI (may be incomplete)
         transcript: Full transcript text
         scenario_type: 'dispatch_checkin' or 'emergency'
+        transcript_lower: transcript.lower(), if the caller already has it
         
     Returns:
-        Updated extracted_data with missing categorical fields filled
+        Updated copy of extracted_data with missing categorical fields
+        filled, or extracted_data itself when nothing is missing
     """
-    updated = {**extracted_data}
-    is_emergency = scenario_type == "emergency"
+    # Nothing to fill: skip the copy and the transcript scans
+    if _has_all_fallback_fields(extracted_data, scenario_type):
+        return extracted_data
+    
+    updated = extracted_data.copy()
+    if transcript_lower is None:
+        transcript_lower = transcript.lower()
     
     # Only fill missing fields with high-confidence patterns
     if scenario_type == "emergency":
         # Emergency scenario fields
         if not updated.get("emergency_type"):
-            emergency_type = extract_emergency_type(transcript)
+            emergency_type = _emergency_type(transcript_lower)
             if emergency_type:
                 updated["emergency_type"] = emergency_type
                 logger.info(f"Fallback extracted emergency_type: {emergency_type}")
         
         if not updated.get("call_outcome"):
-            call_outcome = extract_call_outcome(transcript, is_emergency=True)
+            call_outcome = _call_outcome(transcript_lower, is_emergency=True)
             if call_outcome:
                 updated["call_outcome"] = call_outcome
                 logger.info(f"Fallback extracted call_outcome: {call_outcome}")
         
         if updated.get("load_secure") is None:
-            load_secure = extract_load_secure(transcript)
+            load_secure = _load_secure(transcript_lower)
             if load_secure is not None:
                 updated["load_secure"] = load_secure
                 logger.info(f"Fallback extracted load_secure: {load_secure}")
@@ -181,19 +279,19 @@ def fill_missing_categorical_fields(
     else:  # dispatch_checkin
         # Dispatch check-in scenario fields
         if not updated.get("driver_status"):
-            driver_status = extract_driver_status(transcript)
+            driver_status = _driver_status(transcript_lower)
             if driver_status:
                 updated["driver_status"] = driver_status
                 logger.info(f"Fallback extracted driver_status: {driver_status}")
         
         if not updated.get("call_outcome"):
-            call_outcome = extract_call_outcome(transcript, is_emergency=False)
+            call_outcome = _call_outcome(transcript_lower, is_emergency=False)
             if call_outcome:
                 updated["call_outcome"] = call_outcome
                 logger.info(f"Fallback extracted call_outcome: {call_outcome}")
         
         if updated.get("pod_reminder_acknowledged") is None:
-            pod_ack = extract_pod_reminder_acknowledged(transcript)
+            pod_ack = _pod_reminder_acknowledged(transcript_lower)
             if pod_ack is not None:
                 updated["pod_reminder_acknowledged"] = pod_ack
                 logger.info(f"Fallback extracted pod_reminder_acknowledged: {pod_ack}")
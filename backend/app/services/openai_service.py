@@ -5,13 +5,30 @@ This service handles GPT-4 integration for extracting structured data
 from call transcripts using JSON schema validation.
 """
 
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Optional, Dict, Any
-from openai import OpenAI
+import threading
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Type, Union
+
+import orjson
+from cachetools import TTLCache
+from openai import AsyncOpenAI
 from pydantic import BaseModel, ValidationError
 
 from app.core.config import get_settings
+from app.core.constants import (
+    EXTRACTION_CACHE_MAX_ENTRIES,
+    EXTRACTION_CACHE_TTL_SECONDS,
+    OPENAI_EXTRACTION_MAX_TOKENS,
+    OPENAI_MAX_CONCURRENT_EXTRACTIONS,
+    TRANSCRIPT_TRIM_HEAD_CHARS,
+    TRANSCRIPT_TRIM_TAIL_CHARS,
+    TRANSCRIPT_TRIM_THRESHOLD_CHARS,
+)
+from app.services.extraction_schemas import DispatchCheckInExtraction, EmergencyExtraction
 
 logger = logging.getLogger(__name__)
 
@@ -21,21 +38,117 @@ class OpenAIServiceError(Exception):
     pass
 
 
+# Extraction results by (schema, scenario, prompt, transcript hash). Per-process,
+# like the config cache; it only needs to outlive Retell's redelivery window.
+_extraction_cache: TTLCache = TTLCache(
+    maxsize=EXTRACTION_CACHE_MAX_ENTRIES, ttl=EXTRACTION_CACHE_TTL_SECONDS
+)
+
+
+def _extraction_cache_key(
+    transcript: str, schema: Type[BaseModel], scenario_type: str, system_prompt: Optional[str]
+) -> Tuple[str, str, Optional[str], str]:
+    """Cache key for an extraction; the transcript is hashed, not stored."""
+    digest = hashlib.sha256(transcript.encode()).hexdigest()
+    return (schema.__name__, scenario_type, system_prompt, digest)
+
+
+# Short user prompt: field names and allowed values are enforced by the
+# strict response schema, so they aren't repeated in the prompt
+EXTRACTION_PROMPT_HEAD = "Extract structured information from the following call transcript.\n\nTranscript:\n"
+EXTRACTION_PROMPT_TAIL = "\n\nUse null for any field the transcript doesn't explicitly state."
+TRANSCRIPT_TRIM_MARKER = "\n...[truncated]...\n"
+
+
+def _trim_transcript(transcript: str, scenario_type: str) -> str:
+    """
+    Shorten a long dispatch check-in transcript to its head and tail.
+    
+    Cuts fall on line boundaries where possible, so no utterance is sent
+    half-way. Emergency and short transcripts are returned unchanged.
+    """
+    if scenario_type == "emergency" or len(transcript) <= TRANSCRIPT_TRIM_THRESHOLD_CHARS:
+        return transcript
+    
+    head = transcript[:TRANSCRIPT_TRIM_HEAD_CHARS]
+    head_cut = head.rfind("\n")
+    if head_cut > 0:
+        head = head[:head_cut]
+    
+    tail = transcript[-TRANSCRIPT_TRIM_TAIL_CHARS:]
+    tail_cut = tail.find("\n")
+    if 0 <= tail_cut < len(tail) - 1:
+        tail = tail[tail_cut + 1:]
+    
+    return f"{head}{TRANSCRIPT_TRIM_MARKER}{tail}"
+
+
+def _nullable(field_schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Strict-mode copy of a property schema that also accepts null."""
+    field_schema = {k: v for k, v in field_schema.items() if k not in ("default", "title")}
+    if "const" in field_schema:
+        field_schema["enum"] = [field_schema.pop("const")]
+    
+    options = field_schema.pop("anyOf", None)
+    if options is None:
+        description = field_schema.pop("description", None)
+        options = [field_schema]
+        field_schema = {} if description is None else {"description": description}
+    
+    if {"type": "null"} not in options:
+        options = [*options, {"type": "null"}]
+    field_schema["anyOf"] = options
+    return field_schema
+
+
+@lru_cache(maxsize=8)
+def _strict_response_format(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Build the structured-output response_format once per schema class.
+    
+    Strict mode requires every property to be listed as required and no
+    extra properties, so every field is made nullable: the model can still
+    answer null when the transcript doesn't say, and a null required field
+    fails validation below and goes through the regex fallback as before.
+    """
+    json_schema = schema.model_json_schema()
+    properties = {
+        name: _nullable(field_schema)
+        for name, field_schema in json_schema["properties"].items()
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": schema.__name__,
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
 class OpenAIService:
     """
     Service class for OpenAI operations.
     
     Handles structured extraction from transcripts using GPT-4
     with JSON schema validation.
+    
+    The client is async, so a multi-second completion doesn't block
+    the event loop for other requests.
     """
     
     def __init__(self):
-        """Initialize OpenAI client with API key."""
+        """Initialize async OpenAI client with API key."""
         settings = get_settings()
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.model = "gpt-4o-mini"  # Using gpt-4o-mini for cost efficiency
     
-    def extract_structured_data(
+    async def extract_structured_data(
         self,
         transcript: str,
         schema: BaseModel,
@@ -45,6 +158,11 @@ class OpenAIService:
         """
         Extract structured data from transcript using GPT-4.
         
+        Results that passed schema validation are cached by transcript hash,
+        so a redelivered webhook for the same call doesn't repeat the request.
+        Failures and unvalidated raw results aren't cached. Long dispatch
+        check-in transcripts are sent as head and tail only (see _trim_transcript).
+        
         Args:
             transcript: Full call transcript text
             schema: Pydantic model defining the expected structure
@@ -57,73 +175,48 @@ class OpenAIService:
         Raises:
             OpenAIServiceError: If extraction fails
         """
+        cache_key = _extraction_cache_key(transcript, schema, scenario_type, system_prompt)
+        cached = _extraction_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached extraction for {scenario_type} transcript")
+            return dict(cached)
+        
+        extracted_data, is_valid = await self._extract(transcript, schema, scenario_type, system_prompt)
+        if is_valid:
+            _extraction_cache[cache_key] = extracted_data
+        return dict(extracted_data)
+    
+    async def _extract(
+        self,
+        transcript: str,
+        schema: BaseModel,
+        scenario_type: str,
+        system_prompt: Optional[str],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Run one OpenAI extraction (uncached); see extract_structured_data.
+        
+        Returns:
+            Tuple of (extracted_data, passed_schema_validation)
+        """
         try:
-            # Get JSON schema from Pydantic model
-            json_schema = schema.model_json_schema()
-            
             # Generate system prompt with explicit field name instructions
             if not system_prompt:
-                system_prompt = self._get_default_system_prompt(scenario_type, json_schema)
-            
-            # Extract field names and their allowed values from schema for clearer instructions
-            properties = json_schema.get("properties", {})
-            required_fields = json_schema.get("required", [])
+                system_prompt = self._get_default_system_prompt(scenario_type)
             
-            # Build explicit field list with allowed values
-            field_instructions = []
-            for field_name, field_spec in properties.items():
-                field_desc = f'"{field_name}"'
-                if "enum" in field_spec:
-                    enum_values = ', '.join([f'"{v}"' for v in field_spec['enum']])
-                    field_desc += f" (must be exactly one of: {enum_values})"
-                elif field_spec.get("type") == "boolean":
-                    field_desc += " (boolean: true, false, or null)"
-                elif "anyOf" in field_spec:
-                    # Handle Literal types from Pydantic
-                    for option in field_spec["anyOf"]:
-                        if "const" in option:
-                            const_value = option["const"]
-                            field_desc += f' (must be exactly "{const_value}")'
-                            break
-                field_instructions.append(field_desc)
-            
-            # Build the extraction prompt with explicit instructions
-            user_prompt = f"""Extract structured information from the following call transcript.
-
-CRITICAL FIELD NAME REQUIREMENTS:
-- Use EXACT field names (case-sensitive, singular forms)
-- Do NOT use plural forms (e.g., use "delay_reason" NOT "delay_reasons")
-- Do NOT add fields that are not listed below
-
-Required fields: {', '.join([f'"{f}"' for f in required_fields])}
-
-All fields and their allowed values:
-{chr(10).join(f'- {field}' for field in field_instructions)}
-
-Schema structure:
-{json.dumps(json_schema, indent=2)}
-
-Transcript:
-{transcript}
-
-Instructions:
-1. Use ONLY the exact field names listed above (singular forms, case-sensitive)
-2. For fields with specific allowed values, use ONLY those exact values (no variations)
-3. Extract only information explicitly stated in the transcript
-4. Use null for fields where no information is available
-5. Do not add any fields not in the list above
-
-Return a JSON object using the EXACT field names and values specified above."""
+            transcript = _trim_transcript(transcript, scenario_type)
+            user_prompt = f"{EXTRACTION_PROMPT_HEAD}{transcript}{EXTRACTION_PROMPT_TAIL}"
             
-            # Call OpenAI with structured output
-            response = self.client.chat.completions.create(
+            # Call OpenAI with structured output (schema enforced server-side)
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
                 ],
-                response_format={"type": "json_object"},
+                response_format=_strict_response_format(schema),
                 temperature=0.1,  # Low temperature for consistent extraction
+                max_completion_tokens=OPENAI_EXTRACTION_MAX_TOKENS,
             )
             
             # Parse response
@@ -131,13 +224,14 @@ Return a JSON object using the EXACT field names and values specified above."""
             if not content:
                 raise OpenAIServiceError("Empty response from OpenAI")
             
-            extracted_data = json.loads(content)
-            
-            # Validate against schema
+            # Parse and validate against schema in one pass
             try:
-                validated = schema.model_validate(extracted_data)
-                return validated.model_dump(exclude_none=True)
+                validated = schema.model_validate_json(content)
+                return validated.model_dump(exclude_none=True), True
             except ValidationError as e:
+                # Invalid JSON raises JSONDecodeError here (handled below)
+                extracted_data = orjson.loads(content)
+                
                 # Log the validation errors for debugging
                 error_details = []
                 for error in e.errors():
@@ -151,7 +245,7 @@ Return a JSON object using the EXACT field names and values specified above."""
                     f"Returning raw data (will be handled by fallback extraction)."
                 )
                 # Return raw data - post-processing will handle missing/invalid fields with fallback
-                return extracted_data
+                return extracted_data, False
             
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse OpenAI JSON response: {e}")
@@ -160,13 +254,42 @@ Return a JSON object using the EXACT field names and values specified above."""
             logger.error(f"OpenAI extraction failed: {e}")
             raise OpenAIServiceError(f"Failed to extract structured data: {str(e)}")
     
-    def _get_default_system_prompt(self, scenario_type: str, json_schema: Dict[str, Any]) -> str:
+    async def extract_many(
+        self,
+        items: Sequence[Tuple[str, Type[BaseModel], str]],
+        concurrency: int = OPENAI_MAX_CONCURRENT_EXTRACTIONS,
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Extract structured data from many transcripts concurrently.
+        
+        Requests run in parallel up to `concurrency` at a time, so N
+        extractions take roughly N / concurrency round-trips instead of N.
+        
+        Args:
+            items: (transcript, schema, scenario_type) per transcript
+            concurrency: Max OpenAI requests in flight at once
+            
+        Returns:
+            One entry per item, in order: the extracted data, or the
+            exception raised for that item (one failure doesn't cancel the rest)
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def extract_one(transcript: str, schema: Type[BaseModel], scenario_type: str):
+            async with semaphore:
+                return await self.extract_structured_data(transcript, schema, scenario_type)
+        
+        return await asyncio.gather(
+            *(extract_one(*item) for item in items),
+            return_exceptions=True,
+        )
+    
+    def _get_default_system_prompt(self, scenario_type: str) -> str:
         """
         Get default system prompt for extraction based on scenario type.
         
         Args:
             scenario_type: 'dispatch_checkin' or 'emergency'
-            json_schema: JSON schema from Pydantic model
         """
         base_prompt = """You are an expert at extracting structured information from logistics call transcripts.
 
@@ -200,10 +323,33 @@ For dispatch check-in scenarios, focus on:
 - current_location, eta: Free-form text or null
 
 IMPORTANT: Use singular field names (e.g., "delay_reason" not "delay_reasons")."""
+    
+    async def warm_up(self) -> bool:
+        """
+        Issue a cheap authenticated request to open a pooled connection.
+        
+        Run at startup so the first transcript extraction doesn't pay DNS
+        resolution, the TLS handshake, or JSON schema generation for the
+        response formats. Failures are logged, not raised.
+        """
+        for schema in (DispatchCheckInExtraction, EmergencyExtraction):
+            _strict_response_format(schema)
+        
+        try:
+            await self.client.models.retrieve(self.model)
+            return True
+        except Exception as e:
+            logger.warning(f"OpenAI warm-up failed: {e}")
+            return False
+    
+    async def close(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
 
 
 # Singleton instance for dependency injection
 _openai_service: Optional[OpenAIService] = None
+_openai_service_lock = threading.Lock()
 
 
 def get_openai_service() -> OpenAIService:
@@ -214,6 +360,16 @@ def get_openai_service() -> OpenAIService:
     """
     global _openai_service
     if _openai_service is None:
-        _openai_service = OpenAIService()
+        # Sync dependencies run in FastAPI's threadpool; build only one client
+        with _openai_service_lock:
+            if _openai_service is None:
+                _openai_service = OpenAIService()
     return _openai_service
 
+
+async def close_openai_service() -> None:
+    """Close the shared OpenAI service (called on app shutdown)."""
+    global _openai_service
+    if _openai_service is not None:
+        await _openai_service.close()
+        _openai_service = None
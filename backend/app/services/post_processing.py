@@ -13,9 +13,11 @@ Flow:
 4. Mark summary as partial if still incomplete
 """
 
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 from uuid import UUID
+from postgrest.types import ReturnMethod
 from supabase import Client
 
 from app.services.openai_service import OpenAIService, OpenAIServiceError, get_openai_service
@@ -26,37 +28,35 @@ from app.core.constants import EMERGENCY_KEYWORDS
 
 logger = logging.getLogger(__name__)
 
+# Extracted fields that map to structured_summaries columns
+SUMMARY_DB_FIELDS = frozenset({
+    "call_outcome", "driver_status", "current_location", "eta", "delay_reason",
+    "unloading_status", "pod_reminder_acknowledged", "emergency_type",
+    "safety_status", "injury_status", "emergency_location", "load_secure",
+    "escalation_status",
+})
 
-def _detect_emergency_from_transcript(transcript: str) -> bool:
+
+def _detect_emergency_from_transcript(transcript_lower: str) -> bool:
     """
     Detect if transcript contains emergency indicators.
     
     Args:
-        transcript: Call transcript text
+        transcript_lower: Lowercased call transcript text
         
     Returns:
         True if emergency detected, False otherwise
     """
-    transcript_lower = transcript.lower()
     return any(keyword in transcript_lower for keyword in EMERGENCY_KEYWORDS)
 
 
-def _get_required_fields(scenario_type: ScenarioType) -> list[str]:
-    """
-    Get list of required fields for a scenario type.
-    
-    Required fields are those that must be present for a complete extraction.
-    """
-    if scenario_type == ScenarioType.EMERGENCY:
-        return ["call_outcome", "emergency_type"]
-    else:  # DISPATCH_CHECKIN
-        return ["call_outcome", "driver_status"]
-
-
 def _is_extraction_complete(extracted_data: Dict[str, Any], scenario_type: ScenarioType) -> bool:
     """
     Check if extraction is complete (all required fields present).
     
+    Required fields are call_outcome plus emergency_type (emergency) or
+    driver_status (dispatch check-in).
+    
     Args:
         extracted_data: Extracted data dictionary
         scenario_type: Scenario type
@@ -64,11 +64,11 @@ def _is_extraction_complete(extracted_data: Dict[str, Any], scenario_type: Scena
     Returns:
         True if all required fields are present, False otherwise
     """
-    required_fields = _get_required_fields(scenario_type)
-    return all(
-        field in extracted_data and extracted_data[field] is not None
-        for field in required_fields
-    )
+    if extracted_data.get("call_outcome") is None:
+        return False
+    if scenario_type == ScenarioType.EMERGENCY:
+        return extracted_data.get("emergency_type") is not None
+    return extracted_data.get("driver_status") is not None
 
 
 class PostProcessingService:
@@ -114,8 +114,11 @@ class PostProcessingService:
         """
         logger.info(f"Processing transcript for call {call_id} (scenario: {scenario_type.value})")
         
+        # Lowercase once for emergency detection and the regex fallback
+        transcript_lower = transcript.lower()
+        
         # Detect emergency from transcript (override scenario_type if emergency detected)
-        is_emergency = _detect_emergency_from_transcript(transcript)
+        is_emergency = _detect_emergency_from_transcript(transcript_lower)
         if is_emergency:
             logger.info(f"Emergency detected in transcript for call {call_id}, using EmergencyExtraction schema")
             actual_scenario_type = ScenarioType.EMERGENCY
@@ -130,14 +133,14 @@ class PostProcessingService:
         try:
             if actual_scenario_type == ScenarioType.EMERGENCY:
                 schema = EmergencyExtraction
-                extracted_data = self.openai_service.extract_structured_data(
+                extracted_data = await self.openai_service.extract_structured_data(
                     transcript=transcript,
                     schema=schema,
                     scenario_type=ScenarioType.EMERGENCY.value,
                 )
             else:  # DISPATCH_CHECKIN
                 schema = DispatchCheckInExtraction
-                extracted_data = self.openai_service.extract_structured_data(
+                extracted_data = await self.openai_service.extract_structured_data(
                     transcript=transcript,
                     schema=schema,
                     scenario_type=ScenarioType.DISPATCH_CHECKIN.value,
@@ -151,7 +154,8 @@ class PostProcessingService:
             extracted_data = {}
             extraction_method = "failed_openai"
         
-        # Step 2: Validate required fields (use actual_scenario_type)
+        # Step 2: Validate required fields (use actual_scenario_type). A complete
+        # OpenAI extraction goes straight to the database write
         is_complete = _is_extraction_complete(extracted_data, actual_scenario_type)
         
         # Step 3: If missing required fields, run limited regex fallback
@@ -161,68 +165,44 @@ class PostProcessingService:
                 extracted_data=extracted_data,
                 transcript=transcript,
                 scenario_type=actual_scenario_type.value,
+                transcript_lower=transcript_lower,
             )
             
             if extraction_method == "failed_openai":
                 extraction_method = "regex_fallback_only"
             else:
                 extraction_method = "openai_with_regex_fallback"
-        
-        # Step 4: Check if still incomplete (mark as partial)
-        is_complete = _is_extraction_complete(extracted_data, actual_scenario_type)
-        if not is_complete:
-            is_partial = True
-            logger.info(f"Extraction still incomplete for call {call_id}, marking as partial")
-        
-        # Prepare data for database storage
-        # Filter to only valid database columns (prevent errors from invalid field names)
-        valid_db_fields = {
-            "call_outcome", "driver_status", "current_location", "eta", "delay_reason",
-            "unloading_status", "pod_reminder_acknowledged", "emergency_type",
-            "safety_status", "injury_status", "emergency_location", "load_secure",
-            "escalation_status"
-        }
-        
-        # Filter extracted_data to only include valid database fields
-        filtered_extracted = {
-            k: v for k, v in extracted_data.items()
-            if k in valid_db_fields
-        }
-        
-        raw_extraction_with_metadata = {
-            **extracted_data,  # Keep full extracted data (including invalid fields) in raw_extraction
-            "_extraction_method": extraction_method,
-            "_is_partial": is_partial,
-        }
-        
+            
+            # Step 4: Check if still incomplete (mark as partial)
+            if not _is_extraction_complete(extracted_data, actual_scenario_type):
+                is_partial = True
+                logger.info(f"Extraction still incomplete for call {call_id}, marking as partial")
+        
+        # Build the row in one pass: full extraction (including invalid fields)
+        # plus metadata in raw_extraction, and only valid structured_summaries
+        # columns at the top level (prevent errors from invalid field names).
+        # Every column is written, null when not extracted, so reprocessing a
+        # call clears values left by an earlier extraction
         summary_data = {
             "call_id": str(call_id),
-            "raw_extraction": raw_extraction_with_metadata,
+            "raw_extraction": {
+                **extracted_data,
+                "_extraction_method": extraction_method,
+                "_is_partial": is_partial,
+            },
             "partial": is_partial,  # Store partial flag at top level for easy querying
+            **{field: extracted_data.get(field) for field in SUMMARY_DB_FIELDS},
         }
         
-        # Add only valid extracted fields to summary_data (these map to database columns)
-        summary_data.update(filtered_extracted)
-        
         # Store in database
         try:
-            # Check if summary already exists (update if exists, insert if not)
-            existing = db.table("structured_summaries").select("id").eq("call_id", str(call_id)).execute()
-            
-            if existing.data:
-                # Update existing summary
-                response = db.table("structured_summaries").update(summary_data).eq(
-                    "call_id", str(call_id)
-                ).execute()
-                logger.info(f"Updated structured summary for call {call_id} (partial: {is_partial})")
-            else:
-                # Insert new summary
-                response = db.table("structured_summaries").insert(summary_data).execute()
-                logger.info(f"Created structured summary for call {call_id} (partial: {is_partial})")
-            
-            if not response.data:
-                logger.error(f"Failed to save structured summary for call {call_id}")
-                return extracted_data
+            # Single round-trip insert-or-update, keyed by the unique call_id.
+            # The Supabase client is sync, so run it off the event loop
+            query = db.table("structured_summaries").upsert(
+                summary_data, on_conflict="call_id", returning=ReturnMethod.minimal
+            )
+            await asyncio.to_thread(query.execute)
+            logger.info(f"Saved structured summary for call {call_id} (partial: {is_partial})")
             
             return extracted_data
             
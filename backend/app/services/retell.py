@@ -7,12 +7,23 @@ This service handles all interactions with the Retell AI API:
 - Creating web calls (for non-USA testing)
 """
 
+import asyncio
 import logging
-from typing import Optional, Dict, Any, Union
-from retell import Retell
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple, Union
+
+import httpx
+from retell import AsyncRetell, DefaultAsyncHttpxClient
 from retell.types import WebCallResponse, PhoneCallResponse
 
 from app.core.config import get_settings
+from app.core.constants import (
+    RETELL_CONFIG_CACHE_TTL_SECONDS,
+    RETELL_HTTP_TIMEOUT_SECONDS,
+    RETELL_MAX_CONNECTIONS,
+    RETELL_MAX_KEEPALIVE_CONNECTIONS,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,17 +34,48 @@ class RetellService:
     
     Uses the pre-configured agent from RETELL_AGENT_ID environment variable.
     Updates agent settings and creates calls as needed.
+    
+    All methods are async and share one pooled HTTP client, so concurrent
+    requests don't block the event loop and TLS connections are reused.
     """
     
     def __init__(self):
-        """Initialize Retell client with API key."""
+        """Initialize async Retell client with API key and a pooled HTTP client."""
         settings = get_settings()
-        self.client = Retell(api_key=settings.retell_api_key)
+        self.client = AsyncRetell(
+            api_key=settings.retell_api_key,
+            timeout=RETELL_HTTP_TIMEOUT_SECONDS,
+            http_client=DefaultAsyncHttpxClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=RETELL_MAX_CONNECTIONS,
+                    max_keepalive_connections=RETELL_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            ),
+        )
         self.agent_id = settings.retell_agent_id
         self.from_number = settings.retell_from_number  # Default caller ID
         self.webhook_url = f"{settings.backend_url}/webhooks/retell"
+        # (monotonic fetch time, config) from the last get_agent_config
+        self._agent_config_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        # The agent's LLM ID is effectively static; learned from the first agent fetch
+        self._llm_id: Optional[str] = None
+    
+    def _remember_llm_id(self, agent: Any) -> Optional[str]:
+        """Record the LLM ID from an agent response's response_engine."""
+        response_engine = getattr(agent, 'response_engine', None)
+        llm_id = getattr(response_engine, 'llm_id', None) if response_engine else None
+        self._llm_id = llm_id
+        return llm_id
+    
+    async def _get_llm_id(self) -> Optional[str]:
+        """Return the agent's LLM ID, retrieving the agent only on first use."""
+        if self._llm_id is None:
+            agent = await self.client.agent.retrieve(agent_id=self.agent_id)
+            self._remember_llm_id(agent)
+        return self._llm_id
     
-    def update_agent(
+    async def update_agent(
         self,
         system_prompt: Optional[str] = None,
         initial_message: Optional[str] = None,
@@ -60,54 +102,58 @@ class RetellService:
             Updated agent/LLM data
         """
         try:
-            # Step 1: Get the agent to find its LLM ID
-            agent = self.client.agent.retrieve(agent_id=self.agent_id)
+            # Step 1: Find the agent's LLM ID (cached after the first lookup)
+            llm_id = await self._get_llm_id()
             
-            # Extract LLM ID from response_engine
-            llm_id = None
-            if hasattr(agent, 'response_engine') and agent.response_engine:
-                response_engine = agent.response_engine
-                if hasattr(response_engine, 'llm_id'):
-                    llm_id = response_engine.llm_id
-            
-            # Step 2: Update the LLM with prompt settings (only fields that are provided)
-            if llm_id:
-                llm_update_params = {}
-                if system_prompt is not None:
-                    llm_update_params["general_prompt"] = system_prompt
-                if initial_message is not None:
-                    llm_update_params["begin_message"] = initial_message
-                
-                if llm_update_params:
-                    self.client.llm.update(
-                        llm_id=llm_id,
-                        **llm_update_params
-                    )
-                    logger.info(f"Updated Retell LLM {llm_id} with: {list(llm_update_params.keys())}")
-            else:
-                logger.warning(f"No LLM ID found for agent {self.agent_id}, skipping prompt update")
+            # Step 2: Collect LLM prompt settings and agent voice settings
+            # (only fields that are provided)
+            llm_update_params = {}
+            if system_prompt is not None:
+                llm_update_params["general_prompt"] = system_prompt
+            if initial_message is not None:
+                llm_update_params["begin_message"] = initial_message
             
-            # Step 3: Update the agent with voice settings (only fields that are provided)
             agent_update_params = {}
             if enable_backchanneling is not None:
                 agent_update_params["enable_backchannel"] = enable_backchanneling
             if interruption_sensitivity is not None:
                 agent_update_params["interruption_sensitivity"] = interruption_sensitivity
             
+            # Step 3: The LLM and agent are independent resources; update them concurrently
+            updates = []
+            if llm_update_params:
+                if llm_id:
+                    updates.append(self.client.llm.update(llm_id=llm_id, **llm_update_params))
+                else:
+                    logger.warning(f"No LLM ID found for agent {self.agent_id}, skipping prompt update")
+            if agent_update_params:
+                updates.append(self.client.agent.update(agent_id=self.agent_id, **agent_update_params))
+            
+            # Let both finish before failing, so a partial update is never left unawaited
+            results = await asyncio.gather(*updates, return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                if len(errors) < len(results):
+                    logger.warning("Retell update partially applied: only one of LLM/agent succeeded")
+                raise errors[0]
+            
+            if llm_update_params and llm_id:
+                logger.info(f"Updated Retell LLM {llm_id} with: {list(llm_update_params.keys())}")
             if agent_update_params:
-                self.client.agent.update(
-                    agent_id=self.agent_id,
-                    **agent_update_params
-                )
                 logger.info(f"Updated Retell agent {self.agent_id} with: {list(agent_update_params.keys())}")
             
             return {"agent_id": self.agent_id, "llm_id": llm_id, "updated": True}
             
         except Exception as e:
             logger.error(f"Failed to update Retell agent: {e}")
+            # The agent may have been re-pointed at another LLM; look it up again next time
+            self._llm_id = None
             raise RetellServiceError(f"Failed to update agent: {str(e)}")
+        finally:
+            # Even a failed update may have changed the LLM half
+            self._agent_config_cache = None
     
-    def create_phone_call(
+    async def create_phone_call(
         self,
         to_number: str,
         from_number: Optional[str] = None,
@@ -143,7 +189,7 @@ class RetellService:
                     "The from_number must be a phone number registered in your Retell account."
                 )
             
-            call = self.client.call.create_phone_call(
+            call = await self.client.call.create_phone_call(
                 from_number=from_number,
                 to_number=to_number,
                 override_agent_id=self.agent_id,  # Note: phone calls use override_agent_id
@@ -161,7 +207,7 @@ class RetellService:
             logger.error(f"Failed to create phone call: {e}")
             raise RetellServiceError(f"Failed to create phone call: {str(e)}")
     
-    def create_web_call(
+    async def create_web_call(
         self,
         metadata: Optional[Dict[str, Any]] = None,
         dynamic_variables: Optional[Dict[str, str]] = None,
@@ -180,7 +226,7 @@ class RetellService:
             Call registration with access_token for web SDK
         """
         try:
-            call = self.client.call.create_web_call(
+            call = await self.client.call.create_web_call(
                 agent_id=self.agent_id,  # Note: web calls use agent_id directly
                 metadata=metadata or {},
                 retell_llm_dynamic_variables=dynamic_variables or {},
@@ -193,7 +239,7 @@ class RetellService:
             logger.error(f"Failed to create web call: {e}")
             raise RetellServiceError(f"Failed to create web call: {str(e)}")
     
-    def get_call(self, call_id: str) -> Dict[str, Any]:
+    async def get_call(self, call_id: str) -> Dict[str, Any]:
         """
         Get details of a specific call.
         
@@ -204,22 +250,40 @@ class RetellService:
             Call details from Retell API
         """
         try:
-            call = self.client.call.retrieve(call_id)
+            call = await self.client.call.retrieve(call_id)
             return call
         except Exception as e:
             logger.error(f"Failed to get call {call_id}: {e}")
             raise RetellServiceError(f"Failed to get call: {str(e)}")
     
-    def get_agent_config(self) -> Dict[str, Any]:
+    async def get_agent_config(self, use_cache: bool = False) -> Dict[str, Any]:
         """
         Get current configuration from Retell agent and its LLM.
         
+        Args:
+            use_cache: Serve the last fetched config if it is younger than
+                RETELL_CONFIG_CACHE_TTL_SECONDS (for polling reads; syncs
+                should fetch fresh)
+            
         Returns:
             Dictionary with agent and LLM settings merged
         """
+        if use_cache and self._agent_config_cache is not None:
+            fetched_at, cached_config = self._agent_config_cache
+            if time.monotonic() - fetched_at < RETELL_CONFIG_CACHE_TTL_SECONDS:
+                return dict(cached_config)
+        
         try:
-            # Get agent settings
-            agent = self.client.agent.retrieve(agent_id=self.agent_id)
+            # Get agent settings, and the LLM settings alongside when its ID is already known
+            known_llm_id = self._llm_id
+            if known_llm_id:
+                agent, llm = await asyncio.gather(
+                    self.client.agent.retrieve(agent_id=self.agent_id),
+                    self.client.llm.retrieve(llm_id=known_llm_id),
+                )
+            else:
+                agent = await self.client.agent.retrieve(agent_id=self.agent_id)
+                llm = None
             
             config = {
                 "agent_id": self.agent_id,
@@ -229,25 +293,44 @@ class RetellService:
                 "boosted_keywords": getattr(agent, 'boosted_keywords', []),
             }
             
-            # Get LLM settings if available
-            llm_id = None
-            if hasattr(agent, 'response_engine') and agent.response_engine:
-                response_engine = agent.response_engine
-                if hasattr(response_engine, 'llm_id'):
-                    llm_id = response_engine.llm_id
+            # Get LLM settings if available (refreshes the cached LLM ID)
+            llm_id = self._remember_llm_id(agent)
             
             if llm_id:
-                llm = self.client.llm.retrieve(llm_id=llm_id)
+                if llm_id != known_llm_id:
+                    llm = await self.client.llm.retrieve(llm_id=llm_id)
                 config["llm_id"] = llm_id
                 config["general_prompt"] = getattr(llm, 'general_prompt', None)
                 config["begin_message"] = getattr(llm, 'begin_message', None)
             
             logger.info(f"Retrieved Retell config for agent {self.agent_id}")
+            self._agent_config_cache = (time.monotonic(), dict(config))
             return config
             
         except Exception as e:
             logger.error(f"Failed to get Retell agent config: {e}")
+            # A stale LLM ID would fail the concurrent LLM retrieve every time
+            self._llm_id = None
             raise RetellServiceError(f"Failed to get agent config: {str(e)}")
+    
+    async def warm_up(self) -> bool:
+        """
+        Issue a cheap authenticated request to open a pooled connection.
+        
+        Run at startup so the first call trigger doesn't pay DNS
+        resolution and the TLS handshake. Failures are logged, not raised.
+        """
+        try:
+            agent = await self.client.agent.retrieve(agent_id=self.agent_id)
+            self._remember_llm_id(agent)
+            return True
+        except Exception as e:
+            logger.warning(f"Retell warm-up failed: {e}")
+            return False
+    
+    async def close(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
 
 
 class RetellServiceError(Exception):
@@ -257,6 +340,7 @@ class RetellServiceError(Exception):
 
 # Singleton instance for dependency injection
 _retell_service: Optional[RetellService] = None
+_retell_service_lock = threading.Lock()
 
 
 def get_retell_service() -> RetellService:
@@ -267,6 +351,17 @@ def get_retell_service() -> RetellService:
     """
     global _retell_service
     if _retell_service is None:
-        _retell_service = RetellService()
+        # Sync dependencies run in FastAPI's threadpool; build only one client
+        with _retell_service_lock:
+            if _retell_service is None:
+                _retell_service = RetellService()
     return _retell_service
 
+
+async def close_retell_service() -> None:
+    """Close the shared Retell service (called on app shutdown)."""
+    global _retell_service
+    if _retell_service is not None:
+        await _retell_service.close()
+        _retell_service = None
+
@@ -6,24 +6,32 @@ See: https://docs.retellai.com/api-references/webhooks
 
 from datetime import datetime
 from typing import Optional, List, Any, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, with_config
+from typing_extensions import NotRequired, TypedDict
 
 
 # =============================================================================
 # Transcript Models
 # =============================================================================
 
-class TranscriptUtterance(BaseModel):
+# A TypedDict rather than a model: webhook transcripts carry hundreds of
+# utterances with per-word timings, and validating them as plain dicts is
+# several times faster. They also store as-is, with no per-utterance dump.
+# extra="ignore" keeps unknown keys out, as the model did (otherwise the
+# payload's extra="allow" would apply). words has no default, so utterances
+# without it aren't stored with a "words": null on every row.
+@with_config(ConfigDict(extra="ignore"))
+class TranscriptUtterance(TypedDict):
     """Single utterance in a call transcript."""
     role: Literal["agent", "user"]
     content: str
-    words: Optional[List[dict]] = None
+    words: NotRequired[Optional[List[dict]]]
     
     
 class TranscriptData(BaseModel):
     """Transcript data from Retell."""
     transcript: Optional[str] = None
-    transcript_object: Optional[List[TranscriptUtterance]] = Field(default_factory=list)
+    transcript_object: Optional[List[TranscriptUtterance]] = None
     transcript_with_tool_calls: Optional[List[dict]] = None
 
 
@@ -90,7 +98,7 @@ class CallEndedEvent(RetellWebhookEvent):
     
     # Transcript
     transcript: Optional[str] = None
-    transcript_object: Optional[List[TranscriptUtterance]] = Field(default_factory=list)
+    transcript_object: Optional[List[TranscriptUtterance]] = None
     
     # Custom metadata
     metadata: Optional[dict] = None
@@ -107,7 +115,7 @@ class CallAnalyzedEvent(RetellWebhookEvent):
     
     # Transcript
     transcript: Optional[str] = None
-    transcript_object: Optional[List[TranscriptUtterance]] = Field(default_factory=list)
+    transcript_object: Optional[List[TranscriptUtterance]] = None
     
     # Analysis results
     call_analysis: Optional[CallAnalysis] = None
@@ -145,9 +153,9 @@ class RetellWebhookPayload(BaseModel):
     call_status: Optional[str] = None
     disconnection_reason: Optional[str] = None
     
-    # Transcript
+    # Transcript (transcript_object is None when absent, not [])
     transcript: Optional[str] = None
-    transcript_object: Optional[List[TranscriptUtterance]] = Field(default_factory=list)
+    transcript_object: Optional[List[TranscriptUtterance]] = None
     
     # Analysis (for call_analyzed)
     call_analysis: Optional[CallAnalysis] = None
@@ -8,18 +8,30 @@ Handles webhook events from Retell AI:
 The webhook endpoint receives events and dispatches to appropriate handlers.
 """
 
+import asyncio
 import json
 import logging
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+import orjson
+from cachetools import TTLCache
+from postgrest.types import ReturnMethod
 
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from supabase import Client
 
 from app.core.database import get_db
 from app.core.config import get_settings
-from app.core.constants import RetellEventType
-from app.core.state_machine import StateMachine
+from app.core.constants import (
+    RetellEventType,
+    WEBHOOK_CALL_CACHE_MAX_ENTRIES,
+    WEBHOOK_CALL_CACHE_TTL_SECONDS,
+    WEBHOOK_DEDUP_MAX_ENTRIES,
+    WEBHOOK_DEDUP_TTL_SECONDS,
+    WEBHOOK_PARSE_OFFLOAD_BYTES,
+)
+from app.core.state_machine import detect_emergency
 from app.models.schemas import ScenarioType
 from app.services.post_processing import get_post_processing_service, PostProcessingService
 from app.webhooks.models import RetellWebhookPayload, WebhookResponse
@@ -27,6 +39,9 @@ from app.webhooks.security import verify_webhook_signature
 
 logger = logging.getLogger(__name__)
 
+# Marks a call completed and inserts its transcript in one transaction
+COMPLETE_CALL_FN = "complete_call_with_transcript"
+
 router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 
 
@@ -34,6 +49,21 @@ router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 # Payload Normalization
 # =============================================================================
 
+# Fields copied from Retell's nested 'call' object to the top level
+_CALL_FIELDS = (
+    "call_id",
+    "agent_id",
+    "call_type",
+    "call_status",
+    "duration_ms",
+    "transcript",
+    "transcript_object",
+    "metadata",
+    "start_timestamp",
+    "end_timestamp",
+)
+
+
 def normalize_retell_payload(payload_dict: dict) -> dict:
     """
     Normalize Retell webhook payload structure.
@@ -59,36 +89,140 @@ def normalize_retell_payload(payload_dict: dict) -> dict:
         return payload_dict
     
     # Flatten call object fields to top level
-    normalized = {
-        "event": payload_dict.get("event"),
-        "call_id": call_obj.get("call_id"),
-        "agent_id": call_obj.get("agent_id"),
-        "call_type": call_obj.get("call_type"),
-        "call_status": call_obj.get("call_status"),
-        "duration_ms": call_obj.get("duration_ms"),
-        "transcript": call_obj.get("transcript"),
-        "transcript_object": call_obj.get("transcript_object", []),
-        "metadata": call_obj.get("metadata"),
-        "start_timestamp": call_obj.get("start_timestamp"),
-        "end_timestamp": call_obj.get("end_timestamp"),
-    }
+    normalized = {field: call_obj.get(field) for field in _CALL_FIELDS}
+    normalized["event"] = payload_dict.get("event")
     
     return normalized
 
 
+def parse_retell_payload(body: bytes) -> RetellWebhookPayload:
+    """
+    Parse, normalize and validate a raw (signature-verified) webhook body.
+    
+    Raises:
+        json.JSONDecodeError: If the body isn't valid JSON
+        pydantic.ValidationError: If the payload doesn't match the model
+    """
+    payload_dict = orjson.loads(body)  # Faster than json for large transcript payloads
+    return RetellWebhookPayload(**normalize_retell_payload(payload_dict))
+
+
+# =============================================================================
+# Call Lookup
+# =============================================================================
+
+# retell_call_id -> {"id", "agent_config_id", "scenario_type"} for our call
+# record. Per-process: a miss (another worker, restart) falls back to the query.
+_call_cache: TTLCache = TTLCache(
+    maxsize=WEBHOOK_CALL_CACHE_MAX_ENTRIES, ttl=WEBHOOK_CALL_CACHE_TTL_SECONDS
+)
+
+
+async def _find_call(db: Client, retell_call_id: str) -> Optional[dict]:
+    """
+    Look up our call record for a Retell call ID.
+    
+    Served from _call_cache when an earlier webhook for the call already
+    resolved it; otherwise fetched on a worker thread (supabase-py is sync),
+    so concurrent webhooks' lookups overlap instead of blocking the loop.
+    
+    Returns:
+        {"id", "agent_config_id", "scenario_type"}, or None if no record exists
+    """
+    call = _call_cache.get(retell_call_id)
+    if call is not None:
+        return call
+    
+    call = await asyncio.to_thread(_fetch_call, db, retell_call_id)
+    # Cached here, on the event loop, not in the worker thread: TTLCache isn't
+    # thread-safe and every other access to it happens on the loop
+    if call is not None:
+        _call_cache[retell_call_id] = call
+    return call
+
+
+def _fetch_call(db: Client, retell_call_id: str) -> Optional[dict]:
+    """
+    Fetch the call with its config's scenario_type embedded (many-to-one, so
+    agent_configs is an object or null) in one round trip. Runs in a worker
+    thread, so it doesn't touch _call_cache.
+    """
+    call_response = db.table("calls").select(
+        "id, agent_config_id, agent_configs(scenario_type)"
+    ).eq("retell_call_id", retell_call_id).limit(1).execute()
+    
+    if not call_response.data:
+        return None
+    
+    row = call_response.data[0]
+    agent_config = row.get("agent_configs") or {}
+    return {
+        "id": row["id"],
+        "agent_config_id": row.get("agent_config_id"),
+        "scenario_type": agent_config.get("scenario_type"),
+    }
+
+
+# (retell_call_id, event) -> handler result for events whose writes have
+# completed. Entries are only added once the writes for an event succeeded
+# (see _remember_processed), so a failed write is still retried on redelivery.
+# Per-process; the database writes are idempotent too (transcripts are unique
+# per call, summaries are upserted), so a duplicate that misses here is harmless.
+_processed_events: TTLCache = TTLCache(
+    maxsize=WEBHOOK_DEDUP_MAX_ENTRIES, ttl=WEBHOOK_DEDUP_TTL_SECONDS
+)
+
+
+def _remember_processed(retell_call_id: str, event: str, result: dict) -> None:
+    """Record that an event's writes succeeded, so redeliveries are answered from memory."""
+    _processed_events[(retell_call_id, event)] = result
+
+
 # =============================================================================
 # Event Handlers
 # =============================================================================
 
+def _utc_now_iso() -> str:
+    """Current time as a timezone-aware ISO 8601 string (UTC, millisecond precision)."""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+async def mark_call_started_task(
+    db: Client,
+    internal_call_id: str,
+    update_data: dict,
+    result: dict,
+) -> None:
+    """
+    Background task: store the Retell call ID and mark the call in progress.
+    
+    Runs after the webhook is acknowledged; failures are logged since Retell
+    has already been answered, and the event is only remembered as processed
+    once the update succeeded. A call that already ended is left as is.
+    """
+    query = db.table("calls").update(
+        update_data, returning=ReturnMethod.minimal
+    ).eq("id", internal_call_id).in_("status", ["pending", "in_progress"])
+    try:
+        await asyncio.to_thread(query.execute)
+    except Exception as e:
+        logger.error(f"Error marking call {internal_call_id} in progress: {e}")
+        return
+    
+    logger.info(f"Updated call {internal_call_id} to in_progress")
+    _remember_processed(update_data["retell_call_id"], RetellEventType.CALL_STARTED, result)
+
+
 async def handle_call_started(
     payload: RetellWebhookPayload,
     db: Client,
+    background_tasks: BackgroundTasks,
 ) -> dict:
     """
     Handle call_started event.
     
     - Look up call record by metadata (if we created it)
-    - Update call status to 'in_progress'
+    - Update call status to 'in_progress' (after the response is sent)
     - Store Retell call_id for future reference
     """
     logger.info(f"Call started: {payload.call_id}")
@@ -98,26 +232,38 @@ async def handle_call_started(
     if payload.metadata:
         internal_call_id = payload.metadata.get("internal_call_id")
     
+    result = {"status": "processed", "call_id": payload.call_id}
+    
     if internal_call_id:
         # Update existing call record
         update_data = {
             "retell_call_id": payload.call_id,
             "status": "in_progress",
-            "started_at": datetime.utcnow().isoformat(),
+            "started_at": _utc_now_iso(),
         }
+        background_tasks.add_task(mark_call_started_task, db, internal_call_id, update_data, result)
         
-        db.table("calls").update(update_data).eq("id", internal_call_id).execute()
-        logger.info(f"Updated call {internal_call_id} to in_progress")
+        # trigger_call puts the config's scenario_type in the metadata, so the
+        # later webhooks for this call need no lookup query at all
+        scenario_type_str = payload.metadata.get("scenario_type")
+        if scenario_type_str:
+            _call_cache[payload.call_id] = {
+                "id": internal_call_id,
+                "agent_config_id": None,  # Not in the metadata; only used for logging
+                "scenario_type": scenario_type_str,
+            }
     else:
         # Create new call record for inbound/unexpected calls
         logger.warning(f"No internal_call_id in metadata for call {payload.call_id}")
+        _remember_processed(payload.call_id, RetellEventType.CALL_STARTED, result)
     
-    return {"status": "processed", "call_id": payload.call_id}
+    return result
 
 
 async def handle_call_ended(
     payload: RetellWebhookPayload,
     db: Client,
+    background_tasks: BackgroundTasks,
 ) -> dict:
     """
     Handle call_ended event.
@@ -129,15 +275,12 @@ async def handle_call_ended(
     logger.info(f"Call ended: {payload.call_id}")
     
     # Find call by retell_call_id
-    call_response = db.table("calls").select("*").eq(
-        "retell_call_id", payload.call_id
-    ).execute()
+    call = await _find_call(db, payload.call_id)
     
-    if not call_response.data:
+    if call is None:
         logger.warning(f"No call record found for retell_call_id: {payload.call_id}")
         return {"status": "no_record", "call_id": payload.call_id}
     
-    call = call_response.data[0]
     call_id = call["id"]
     
     # Calculate duration
@@ -145,35 +288,30 @@ async def handle_call_ended(
     if payload.duration_ms:
         duration_seconds = payload.duration_ms // 1000
     
-    # Update call record
-    update_data = {
-        "status": "completed",
-        "ended_at": datetime.utcnow().isoformat(),
-        "duration_seconds": duration_seconds,
-    }
-    
-    db.table("calls").update(update_data).eq("id", call_id).execute()
-    
-    # Store transcript
-    if payload.transcript or payload.transcript_object:
-        transcript_data = {
-            "call_id": call_id,
-            "raw_transcript": payload.transcript,
-            "utterances": [u.model_dump() for u in (payload.transcript_object or [])],
-        }
-        
-        db.table("transcripts").insert(transcript_data).execute()
+    # Update call record and store the transcript (if any) in one transaction.
+    # Inline, not deferred: a failure returns 5xx so Retell redelivers the event
+    has_transcript = bool(payload.transcript or payload.transcript_object)
+    await asyncio.to_thread(db.rpc(COMPLETE_CALL_FN, {
+        "p_call_id": call_id,
+        "p_ended_at": _utc_now_iso(),
+        "p_duration_seconds": duration_seconds,
+        "p_raw_transcript": payload.transcript if has_transcript else None,
+        "p_utterances": (payload.transcript_object or []) if has_transcript else None,
+    }).execute)
+    
+    if has_transcript:
         logger.info(f"Stored transcript for call {call_id}")
     
     # Check for emergency in transcript
     if payload.transcript:
-        state_machine = StateMachine()
-        is_emergency = state_machine.handle_emergency(payload.transcript)
+        emergency_type = detect_emergency(payload.transcript)
         
-        if is_emergency:
-            logger.warning(f"Emergency detected in call {call_id}: {state_machine.context.emergency_type}")
+        if emergency_type:
+            logger.warning(f"Emergency detected in call {call_id}: {emergency_type}")
     
-    return {"status": "processed", "call_id": payload.call_id, "internal_call_id": call_id}
+    result = {"status": "processed", "call_id": payload.call_id, "internal_call_id": call_id}
+    _remember_processed(payload.call_id, RetellEventType.CALL_ENDED, result)
+    return result
 
 
 async def process_transcript_task(
@@ -216,31 +354,24 @@ async def handle_call_analyzed(
     """
     logger.info(f"Call analyzed: {payload.call_id}")
     
-    # Find call by retell_call_id
-    call_response = db.table("calls").select("*").eq(
-        "retell_call_id", payload.call_id
-    ).execute()
+    # Find call (and its config's scenario_type) by retell_call_id
+    call = await _find_call(db, payload.call_id)
     
-    if not call_response.data:
+    if call is None:
         logger.warning(f"No call record found for retell_call_id: {payload.call_id}")
         return {"status": "no_record", "call_id": payload.call_id}
     
-    call = call_response.data[0]
     call_id = call["id"]
-    agent_config_id = call.get("agent_config_id")
+    agent_config_id = call["agent_config_id"]
     
     # Determine scenario_type from agent_config (no hardcoded defaults)
     scenario_type = None
-    if agent_config_id:
-        config_response = db.table("agent_configs").select("scenario_type").eq(
-            "id", agent_config_id
-        ).execute()
-        if config_response.data:
-            scenario_type_str = config_response.data[0].get("scenario_type")
-            try:
-                scenario_type = ScenarioType(scenario_type_str)
-            except ValueError:
-                logger.error(f"Unknown scenario_type {scenario_type_str} for agent_config {agent_config_id}")
+    scenario_type_str = call["scenario_type"]
+    if scenario_type_str:
+        try:
+            scenario_type = ScenarioType(scenario_type_str)
+        except ValueError:
+            logger.error(f"Unknown scenario_type {scenario_type_str} for agent_config {agent_config_id}")
     
     if not scenario_type:
         logger.error(f"No valid scenario_type found for call {call_id} (agent_config_id: {agent_config_id}). Cannot process transcript.")
@@ -267,13 +398,27 @@ async def handle_call_analyzed(
     else:
         logger.warning(f"No transcript available for call {call_id}, skipping post-processing")
     
-    return {
+    result = {
         "status": "processed",
         "call_id": payload.call_id,
         "internal_call_id": call_id,
         "analysis_received": payload.call_analysis is not None,
         "post_processing_queued": payload.transcript is not None,
     }
+    # Post-processing reports a failed summary write only in its logs, so an
+    # event that queued it isn't remembered: a redelivery runs it again (the
+    # extraction cache and the summary upsert keep that cheap and idempotent)
+    if not payload.transcript:
+        _remember_processed(payload.call_id, RetellEventType.CALL_ANALYZED, result)
+    return result
+
+
+# Handler per event type; all take (payload, db, background_tasks)
+_EVENT_HANDLERS: Dict[str, Callable[[RetellWebhookPayload, Client, BackgroundTasks], Awaitable[dict]]] = {
+    RetellEventType.CALL_STARTED: handle_call_started,
+    RetellEventType.CALL_ENDED: handle_call_ended,
+    RetellEventType.CALL_ANALYZED: handle_call_analyzed,
+}
 
 
 # =============================================================================
@@ -297,20 +442,30 @@ async def retell_webhook(
     Webhook signature is verified before processing.
     """
     try:
-        # Parse and normalize payload
-        payload_dict = json.loads(body)
-        normalized = normalize_retell_payload(payload_dict)
-        payload = RetellWebhookPayload(**normalized)
+        # Parse and normalize payload. Long transcripts take milliseconds to
+        # validate, so large bodies are handled off the event loop
+        if len(body) >= WEBHOOK_PARSE_OFFLOAD_BYTES:
+            payload = await asyncio.to_thread(parse_retell_payload, body)
+        else:
+            payload = parse_retell_payload(body)
         
         logger.info(f"Received Retell webhook: {payload.event} for call {payload.call_id}")
         
+        # Answer redeliveries of an already-processed event from memory
+        event_key = (payload.call_id, payload.event)
+        result = _processed_events.get(event_key)
+        if result is not None:
+            logger.info(f"Duplicate {payload.event} webhook for call {payload.call_id}, skipping")
+            return WebhookResponse(
+                success=True,
+                message=f"Processed {payload.event} event",
+                data=result,
+            )
+        
         # Dispatch to appropriate handler
-        if payload.event == RetellEventType.CALL_STARTED:
-            result = await handle_call_started(payload, db)
-        elif payload.event == RetellEventType.CALL_ENDED:
-            result = await handle_call_ended(payload, db)
-        elif payload.event == RetellEventType.CALL_ANALYZED:
-            result = await handle_call_analyzed(payload, db, background_tasks)
+        handler = _EVENT_HANDLERS.get(payload.event)
+        if handler is not None:
+            result = await handler(payload, db, background_tasks)
         else:
             logger.warning(f"Unknown webhook event type: {payload.event}")
             result = {"status": "unknown_event", "event": payload.event}
@@ -321,7 +476,7 @@ async def retell_webhook(
             data=result,
         )
         
-    except json.JSONDecodeError as e:
+    except json.JSONDecodeError as e:  # orjson.JSONDecodeError subclasses this
         logger.error(f"Invalid JSON in webhook payload: {e}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
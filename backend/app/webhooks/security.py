@@ -6,6 +6,7 @@ This module provides utilities to verify those signatures.
 
 import hmac
 import hashlib
+from functools import lru_cache
 from typing import Optional
 
 from fastapi import Request, HTTPException, status, Depends
@@ -23,6 +24,17 @@ async def get_raw_body(request: Request) -> bytes:
     return await request.body()
 
 
+@lru_cache(maxsize=4)
+def _hmac_template(secret: str) -> "hmac.HMAC":
+    """
+    Keyed HMAC-SHA256 with no data yet, built once per secret.
+    
+    Copying it reuses the precomputed key pads instead of encoding the
+    secret and keying a new HMAC on every webhook.
+    """
+    return hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+
 def verify_retell_signature(
     payload: bytes,
     signature: Optional[str],
@@ -49,14 +61,13 @@ def verify_retell_signature(
         return True
     
     # Compute expected signature
-    expected_signature = hmac.new(
-        secret.encode("utf-8"),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
-    
-    # Constant-time comparison to prevent timing attacks
-    return hmac.compare_digest(signature, expected_signature)
+    mac = _hmac_template(secret).copy()
+    mac.update(payload)
+    expected_signature = mac.hexdigest().encode("ascii")
+    
+    # Constant-time comparison to prevent timing attacks. Compared as bytes:
+    # compare_digest raises TypeError for a str holding non-ASCII characters
+    return hmac.compare_digest(signature.encode("utf-8"), expected_signature)
 
 
 async def verify_webhook_signature(
@@ -77,15 +88,21 @@ async def verify_webhook_signature(
     """
     settings = get_settings()
     
-    # Get raw body
-    body = await request.body()
+    # In development/simulated mode, skip verification
+    if settings.call_mode == "simulated":
+        return await request.body()
     
-    # Get signature from header
+    # Get signature from header; unsigned requests are rejected before the
+    # body is read
     signature = request.headers.get("X-Retell-Signature")
+    if not signature:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
     
-    # In development/simulated mode, skip verification
-    if settings.call_mode == "simulated":
-        return body
+    # Get raw body (the route handler receives these bytes; it never re-reads)
+    body = await request.body()
     
     # Verify signature
     if not verify_retell_signature(body, signature, settings.retell_webhook_secret):
@@ -114,12 +131,13 @@ class WebhookAuthenticator:
     
     async def __call__(self, request: Request) -> bytes:
         """Make authenticator callable as a FastAPI dependency."""
-        body = await request.body()
-        signature = request.headers.get("X-Retell-Signature")
-        
         settings = get_settings()
         if self.skip_in_dev and settings.call_mode == "simulated":
-            return body
+            return await request.body()
+        
+        # Read the body only for requests that carry a signature
+        signature = request.headers.get("X-Retell-Signature")
+        body = await request.body() if signature else b""
         
         if not self.verify(body, signature):
             raise HTTPException(
@@ -1,19 +1,26 @@
 """Pytest configuration and fixtures."""
 
 import pytest
-from unittest.mock import Mock, MagicMock
-from supabase import Client
+from types import SimpleNamespace
 
 
-@pytest.fixture
+class _FluentDbStub:
+    """
+    Stand-in for the Supabase client's fluent query builder.
+
+    Every builder method (table, select, eq, ...) returns the stub itself,
+    and execute() returns an empty result. Holds no state, so one instance
+    is shared by the whole session.
+    """
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return SimpleNamespace(data=[])
+
+
+@pytest.fixture(scope="session")
 def mock_db():
     """Mock Supabase client for testing."""
-    db = Mock(spec=Client)
-    db.table = Mock(return_value=db)
-    db.select = Mock(return_value=db)
-    db.insert = Mock(return_value=db)
-    db.update = Mock(return_value=db)
-    db.eq = Mock(return_value=db)
-    db.execute = Mock(return_value=MagicMock(data=[]))
-    return db
-
+    return _FluentDbStub()
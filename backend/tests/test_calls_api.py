@@ -0,0 +1,89 @@
+"""
+Unit tests for calls API helpers:
+- keyset pagination cursors
+- initial message placeholder substitution
+- flattening embedded transcript/summary rows
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.calls import (
+    _encode_cursor,
+    _decode_cursor,
+    _fill_placeholders,
+    _flatten_call_details,
+)
+
+
+class TestCallCursor:
+    """Tests for cursor encoding/decoding."""
+
+    def test_round_trip(self):
+        """Test that a cursor decodes back to the row's keyset position."""
+        row = {
+            "id": "6f1c2a3e-8b4d-4e5f-9a6b-7c8d9e0f1a2b",
+            "created_at": "2024-01-15T10:30:00.123456+00:00",
+        }
+        position = _decode_cursor(_encode_cursor(row))
+        assert position == {"ts": row["created_at"], "id": row["id"]}
+
+    def test_cursor_is_url_safe(self):
+        """Test that the encoded cursor can be passed as a query parameter."""
+        row = {
+            "id": "6f1c2a3e-8b4d-4e5f-9a6b-7c8d9e0f1a2b",
+            "created_at": "2024-01-15T10:30:00+00:00",
+        }
+        cursor = _encode_cursor(row)
+        assert "+" not in cursor and "/" not in cursor
+
+    def test_malformed_cursor_rejected(self):
+        """Test that garbage cursors raise a 400."""
+        with pytest.raises(HTTPException) as exc_info:
+            _decode_cursor("not-a-cursor")
+        assert exc_info.value.status_code == 400
+
+    def test_invalid_id_rejected(self):
+        """Test that cursors with a non-UUID id raise a 400 (no filter injection)."""
+        bad = _encode_cursor({"id": "1),id.gt.(0", "created_at": "2024-01-15T10:30:00+00:00"})
+        with pytest.raises(HTTPException) as exc_info:
+            _decode_cursor(bad)
+        assert exc_info.value.status_code == 400
+
+
+class TestFillPlaceholders:
+    """Tests for {{name}} placeholder substitution."""
+
+    def test_known_placeholders(self):
+        """Test that known placeholders are replaced."""
+        template = "Hi {{driver_name}}, checking on load {{load_number}}."
+        values = {"driver_name": "Mike", "load_number": "7891-B"}
+        assert _fill_placeholders(template, values) == "Hi Mike, checking on load 7891-B."
+
+    def test_unknown_placeholder_kept(self):
+        """Test that unknown placeholders are left untouched."""
+        assert _fill_placeholders("Hi {{nickname}}", {"driver_name": "Mike"}) == "Hi {{nickname}}"
+
+    def test_empty_template(self):
+        """Test that an empty template stays empty."""
+        assert _fill_placeholders("", {"driver_name": "Mike"}) == ""
+
+
+class TestFlattenCallDetails:
+    """Tests for converting PostgREST embeds into CallWithDetails fields."""
+
+    def test_one_to_many_lists(self):
+        """Test that list embeds use their first row."""
+        call = {"id": "c1", "transcripts": [{"id": "t1"}], "structured_summaries": []}
+        flattened = _flatten_call_details(call)
+        assert flattened["transcript"] == {"id": "t1"}
+        assert flattened["structured_summary"] is None
+        assert "transcripts" not in flattened
+
+    def test_one_to_one_object(self):
+        """Test that an object embed (unique foreign key) is used as-is."""
+        call = {"id": "c1", "transcripts": None, "structured_summaries": {"id": "s1"}}
+        flattened = _flatten_call_details(call)
+        assert flattened["transcript"] is None
+        assert flattened["structured_summary"] == {"id": "s1"}
+        assert "structured_summaries" not in flattened
@@ -0,0 +1,105 @@
+"""
+Unit tests for the in-process config cache.
+"""
+
+import pytest
+from app.core.config_cache import (
+    MISSING,
+    get_cached,
+    set_cached,
+    get_cached_active_config,
+    set_cached_active_config,
+    invalidate_config_cache,
+    refresh_config_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Ensure each test starts with an empty cache."""
+    invalidate_config_cache()
+    yield
+    invalidate_config_cache()
+
+
+class TestActiveConfigCache:
+    """Tests for active config caching and invalidation."""
+
+    def test_miss_returns_none(self):
+        """Test that an empty cache returns None."""
+        assert get_cached_active_config() is None
+
+    def test_set_then_get(self):
+        """Test that a stored config is returned."""
+        config = {"id": "abc", "is_active": True}
+        set_cached_active_config(config)
+        assert get_cached_active_config() == config
+
+    def test_invalidate(self):
+        """Test that invalidation drops the cached config."""
+        set_cached_active_config({"id": "abc", "is_active": True})
+        invalidate_config_cache()
+        assert get_cached_active_config() is None
+
+    def test_invalidate_when_empty(self):
+        """Test that invalidating an empty cache is a no-op."""
+        invalidate_config_cache()
+        assert get_cached_active_config() is None
+
+
+class TestConfigReadCache:
+    """Tests for keyed config read caching."""
+
+    def test_miss_returns_sentinel(self):
+        """Test that a miss is distinguishable from a cached None."""
+        assert get_cached(("get_active_config", "emergency")) is MISSING
+
+    def test_cached_none(self):
+        """Test that None results are cached (no active config)."""
+        set_cached(("get_active_config", "emergency"), None)
+        assert get_cached(("get_active_config", "emergency")) is None
+
+    def test_invalidate_clears_all_keys(self):
+        """Test that invalidation drops every cached read."""
+        set_cached(("list_configs", None, None), [])
+        set_cached_active_config({"id": "abc", "is_active": True})
+        invalidate_config_cache()
+        assert get_cached(("list_configs", None, None)) is MISSING
+        assert get_cached_active_config() is None
+
+
+class TestRefreshConfigCache:
+    """Tests for write-through of the active config after a write."""
+
+    def test_active_write_is_cached(self):
+        """Test that an active written config becomes the cached active config."""
+        set_cached(("list_configs", None, None), [])
+        config = {"id": "abc", "is_active": True}
+        refresh_config_cache(config)
+        assert get_cached_active_config() == config
+        assert get_cached(("list_configs", None, None)) is MISSING
+
+    def test_inactive_write_clears_active(self):
+        """Test that an inactive written config doesn't stay cached as active."""
+        set_cached_active_config({"id": "abc", "is_active": True})
+        refresh_config_cache({"id": "abc", "is_active": False})
+        assert get_cached_active_config() is None
+
+
+class TestThreadSafety:
+    """Tests for concurrent cache access from threadpool handlers."""
+
+    def test_concurrent_reads_and_writes(self):
+        """Test that concurrent gets, sets and invalidations don't raise."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        def worker(i):
+            for j in range(500):
+                key = ("list_configs", i, j % 8)
+                set_cached(key, [j])
+                get_cached(key)
+                if j % 50 == 0:
+                    refresh_config_cache({"id": str(i), "is_active": bool(j % 2)})
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(worker, range(8)))
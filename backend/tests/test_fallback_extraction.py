@@ -82,6 +82,33 @@ class TestDispatchCheckInFallback:
         assert result["call_outcome"] == "In-Transit Update"  # Preserved
         assert result["driver_status"] == "Driving"  # Added by fallback
 
+    def test_fill_missing_fields_mixed_case(self):
+        """Test that the fill path matches regardless of transcript casing."""
+        transcript = "JUST GOT HERE. Yes, I'll get the POD signed."
+        result = fill_missing_categorical_fields({}, transcript, "dispatch_checkin")
+
+        assert result["driver_status"] == "Arrived"
+        assert result["call_outcome"] == "Arrival Confirmation"
+        assert result["pod_reminder_acknowledged"] is True
+
+    def test_fill_skipped_when_nothing_missing(self):
+        """Test that complete data is returned as-is without scanning."""
+        extracted_data = {
+            "call_outcome": "In-Transit Update",
+            "driver_status": "Driving",
+            "pod_reminder_acknowledged": False,
+        }
+        result = fill_missing_categorical_fields(extracted_data, "I just arrived.", "dispatch_checkin")
+
+        assert result is extracted_data
+        assert result["driver_status"] == "Driving"
+
+    def test_category_priority_not_position(self):
+        """Test that a higher-priority status wins even when mentioned later."""
+        transcript = "I was driving all morning and I just arrived."
+        assert extract_driver_status(transcript) == "Arrived"
+        assert extract_call_outcome(transcript) == "Arrival Confirmation"
+
 
 class TestEmergencyFallback:
     """Tests for emergency categorical field extraction."""
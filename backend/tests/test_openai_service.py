@@ -0,0 +1,171 @@
+"""
+Unit tests for the OpenAI extraction service:
+- strict structured-output response format
+- extraction result caching
+- long transcript trimming (and the untrimmed regex fallback)
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models.schemas import ScenarioType
+from app.services.extraction_schemas import DispatchCheckInExtraction, EmergencyExtraction
+from app.services.openai_service import (
+    OpenAIService,
+    OpenAIServiceError,
+    TRANSCRIPT_TRIM_MARKER,
+    _extraction_cache,
+    _strict_response_format,
+    _trim_transcript,
+)
+from app.services.post_processing import PostProcessingService
+
+
+def _completion(content):
+    """Build a chat completion response with the given message content."""
+    return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
+
+
+@pytest.fixture
+def service():
+    """OpenAI service with a mocked async client."""
+    svc = OpenAIService.__new__(OpenAIService)
+    svc.model = "gpt-4o-mini"
+    svc.client = MagicMock()
+    svc.client.chat.completions.create = AsyncMock()
+    return svc
+
+
+@pytest.fixture(autouse=True)
+def clear_extraction_cache():
+    """Ensure each test starts with an empty extraction cache."""
+    _extraction_cache.clear()
+    yield
+    _extraction_cache.clear()
+
+
+class TestStrictResponseFormat:
+    """Tests for the strict json_schema response format."""
+
+    def test_all_fields_required_and_nullable(self):
+        """Test that every field is required but accepts null."""
+        schema = _strict_response_format(DispatchCheckInExtraction)["json_schema"]["schema"]
+        assert schema["additionalProperties"] is False
+        assert set(schema["required"]) == set(DispatchCheckInExtraction.model_fields)
+        for field_schema in schema["properties"].values():
+            assert {"type": "null"} in field_schema["anyOf"]
+            assert "default" not in field_schema
+
+    def test_const_becomes_enum(self):
+        """Test that single-value Literal fields are sent as enums."""
+        schema = _strict_response_format(EmergencyExtraction)["json_schema"]["schema"]
+        options = schema["properties"]["escalation_status"]["anyOf"]
+        assert {"type": "string", "enum": ["Connected to Human Dispatcher"]} in options
+
+
+class TestExtractionCache:
+    """Tests for caching extractions by transcript hash."""
+
+    @pytest.mark.asyncio
+    async def test_repeat_transcript_uses_cache(self, service):
+        """Test that the same transcript is only sent to OpenAI once."""
+        service.client.chat.completions.create.return_value = _completion(
+            '{"call_outcome": "In-Transit Update", "driver_status": "Driving"}'
+        )
+        first = await service.extract_structured_data("I'm driving", DispatchCheckInExtraction, "dispatch_checkin")
+        second = await service.extract_structured_data("I'm driving", DispatchCheckInExtraction, "dispatch_checkin")
+
+        assert first == second == {"call_outcome": "In-Transit Update", "driver_status": "Driving"}
+        assert service.client.chat.completions.create.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_result_is_a_copy(self, service):
+        """Test that mutating a returned result doesn't change the cache."""
+        service.client.chat.completions.create.return_value = _completion(
+            '{"call_outcome": "In-Transit Update", "driver_status": "Driving"}'
+        )
+        first = await service.extract_structured_data("I'm driving", DispatchCheckInExtraction, "dispatch_checkin")
+        first["driver_status"] = "Arrived"
+        second = await service.extract_structured_data("I'm driving", DispatchCheckInExtraction, "dispatch_checkin")
+
+        assert second["driver_status"] == "Driving"
+
+    @pytest.mark.asyncio
+    async def test_failures_not_cached(self, service):
+        """Test that a failed extraction is retried on the next call."""
+        service.client.chat.completions.create.return_value = _completion("not json")
+        with pytest.raises(OpenAIServiceError):
+            await service.extract_structured_data("I'm driving", DispatchCheckInExtraction, "dispatch_checkin")
+
+        service.client.chat.completions.create.return_value = _completion(
+            '{"call_outcome": "In-Transit Update", "driver_status": "Driving"}'
+        )
+        result = await service.extract_structured_data("I'm driving", DispatchCheckInExtraction, "dispatch_checkin")
+
+        assert result["driver_status"] == "Driving"
+        assert service.client.chat.completions.create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_unvalidated_results_not_cached(self, service):
+        """Test that raw data returned after a schema validation failure is not cached."""
+        service.client.chat.completions.create.return_value = _completion(
+            '{"call_outcome": "Not An Outcome", "driver_status": "Driving"}'
+        )
+        first = await service.extract_structured_data("I'm driving", DispatchCheckInExtraction, "dispatch_checkin")
+
+        service.client.chat.completions.create.return_value = _completion(
+            '{"call_outcome": "In-Transit Update", "driver_status": "Driving"}'
+        )
+        second = await service.extract_structured_data("I'm driving", DispatchCheckInExtraction, "dispatch_checkin")
+
+        assert first["call_outcome"] == "Not An Outcome"
+        assert second["call_outcome"] == "In-Transit Update"
+        assert service.client.chat.completions.create.await_count == 2
+
+class TestTrimTranscript:
+    """Tests for head + tail trimming of long transcripts."""
+
+    def _long_transcript(self):
+        """Build a transcript well over the trim threshold."""
+        lines = [f"User: update number {i}, still driving on I-10." for i in range(400)]
+        return "\n".join(["Agent: Hi, this is dispatch.", *lines, "User: Just arrived at the dock."])
+
+    def test_short_transcript_unchanged(self):
+        """Test that transcripts under the threshold are sent in full."""
+        transcript = "Agent: Where are you?\nUser: Driving on I-10."
+        assert _trim_transcript(transcript, "dispatch_checkin") is transcript
+
+    def test_emergency_never_trimmed(self):
+        """Test that emergency transcripts are always sent in full."""
+        transcript = self._long_transcript()
+        assert _trim_transcript(transcript, "emergency") is transcript
+
+    def test_long_dispatch_keeps_head_and_tail(self):
+        """Test that a long check-in keeps whole opening and closing lines."""
+        transcript = self._long_transcript()
+        trimmed = _trim_transcript(transcript, "dispatch_checkin")
+
+        assert len(trimmed) < len(transcript) // 2
+        head, tail = trimmed.split(TRANSCRIPT_TRIM_MARKER)
+        assert head.startswith("Agent: Hi, this is dispatch.")
+        assert tail.endswith("User: Just arrived at the dock.")
+        assert transcript.splitlines()[-20] in tail.splitlines()
+        assert all(line in transcript.splitlines() for line in (head + "\n" + tail).splitlines())
+
+    @pytest.mark.asyncio
+    async def test_mid_transcript_fact_reaches_summary(self, service):
+        """Test that a fact only in the trimmed-away middle is still filled by the regex fallback."""
+        filler = [f"User: update number {i}, nothing new on my end." for i in range(200)]
+        fact = "User: I'm unloading now, in door 42."
+        transcript = "\n".join(["Agent: Hi, this is dispatch.", *filler, fact, *filler, "User: Thanks, bye."])
+        service.client.chat.completions.create.return_value = _completion(
+            '{"call_outcome": "Arrival Confirmation", "driver_status": null}'
+        )
+
+        result = await PostProcessingService(openai_service=service).process_transcript(
+            "call-1", transcript, ScenarioType.DISPATCH_CHECKIN, MagicMock()
+        )
+
+        messages = service.client.chat.completions.create.await_args.kwargs["messages"]
+        assert all(fact not in message["content"] for message in messages)
+        assert result["driver_status"] == "Unloading"
@@ -0,0 +1,32 @@
+"""
+Unit tests for transcript post-processing:
+- the structured summary row written for a call
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models.schemas import ScenarioType
+from app.services.post_processing import SUMMARY_DB_FIELDS, PostProcessingService
+
+
+class TestSummaryRow:
+    """Tests for the structured_summaries upsert payload."""
+
+    @pytest.mark.asyncio
+    async def test_missing_fields_written_as_null(self):
+        """Test that columns without an extracted value are written as null, clearing stale values."""
+        openai_service = MagicMock()
+        openai_service.extract_structured_data = AsyncMock(
+            return_value={"call_outcome": "In-Transit Update", "driver_status": "Driving"}
+        )
+        db = MagicMock()
+
+        await PostProcessingService(openai_service=openai_service).process_transcript(
+            "call-1", "User: I'm driving on I-10.", ScenarioType.DISPATCH_CHECKIN, db
+        )
+
+        row = db.table.return_value.upsert.call_args.args[0]
+        assert SUMMARY_DB_FIELDS <= row.keys()
+        assert row["driver_status"] == "Driving"
+        assert row["eta"] is None
@@ -0,0 +1,142 @@
+"""
+Unit tests for conversation state machine utterance checks.
+"""
+
+import logging
+
+import pytest
+from app.core.constants import ConversationState, MAX_CONTEXT_UTTERANCES
+from app.core.state_machine import StateMachine, detect_emergency
+
+
+class TestTransitions:
+    """Tests for state transitions."""
+    
+    def test_valid_transition(self):
+        """Test that a listed successor is accepted."""
+        sm = StateMachine()
+        assert sm.transition(ConversationState.GATHERING_STATUS)
+        assert sm.get_state() == ConversationState.GATHERING_STATUS
+    
+    def test_invalid_transition(self):
+        """Test that an unlisted successor is rejected."""
+        sm = StateMachine()
+        assert not sm.transition(ConversationState.COMPLETED)
+        assert sm.get_state() == ConversationState.INITIAL
+    
+    def test_terminal_states(self):
+        """Test that only completed and failed are terminal."""
+        sm = StateMachine()
+        assert not sm.is_terminal()
+        sm.context.state = ConversationState.FAILED
+        assert sm.is_terminal()
+        sm.context.state = ConversationState.COMPLETED
+        assert sm.is_terminal()
+
+
+class TestEmergencyDetection:
+    """Tests for emergency keyword detection and classification."""
+    
+    def test_no_emergency(self):
+        """Test that routine updates are not flagged."""
+        assert StateMachine().detect_emergency("Driving on I-10, ETA 8am") == (False, None)
+    
+    def test_accident(self):
+        """Test that accident keywords classify as Accident (case-insensitive)."""
+        assert StateMachine().detect_emergency("There was a CRASH ahead") == (True, "Accident")
+    
+    def test_breakdown(self):
+        """Test that a blowout classifies as Breakdown."""
+        assert StateMachine().detect_emergency("I just had a blowout") == (True, "Breakdown")
+    
+    def test_medical(self):
+        """Test that injury keywords classify as Medical."""
+        assert StateMachine().detect_emergency("I'm hurt and bleeding") == (True, "Medical")
+    
+    def test_priority_order(self):
+        """Test that Accident wins over Medical when both match."""
+        assert StateMachine().detect_emergency("Accident, call an ambulance") == (True, "Accident")
+    
+    def test_other(self):
+        """Test that unclassified emergencies fall back to Other."""
+        assert StateMachine().detect_emergency("Call 911") == (True, "Other")
+    
+    def test_module_level_detector(self):
+        """Test that detect_emergency works without a state machine."""
+        assert detect_emergency("There was a CRASH ahead") == "Accident"
+        assert detect_emergency("Driving on I-10, ETA 8am") is None
+
+
+class TestResponseChecks:
+    """Tests for unclear and uncooperative response checks."""
+    
+    def test_unclear_indicator(self):
+        """Test that transcription markers are detected (case-insensitive)."""
+        assert StateMachine().is_unclear_response("I'm at [INAUDIBLE] exit")
+    
+    def test_clear_response(self):
+        """Test that a normal answer is not unclear."""
+        assert not StateMachine().is_unclear_response("I'm at exit 42")
+    
+    def test_uncooperative_short_answer(self):
+        """Test that one-word answers are uncooperative."""
+        assert StateMachine().is_uncooperative_response("  Yeah ")
+    
+    def test_longer_answer_not_uncooperative(self):
+        """Test that answers over two words are not uncooperative."""
+        assert not StateMachine().is_uncooperative_response("yes, still driving")
+
+
+class TestSerialization:
+    """Tests for context round-tripping through dicts."""
+    
+    def test_round_trip(self):
+        """Test that to_dict/from_dict preserve every field."""
+        sm = StateMachine()
+        sm.handle_emergency("I had a blowout")
+        sm.add_utterance("user", "I had a blowout")
+        restored = StateMachine.from_dict(sm.to_dict())
+        assert restored.context == sm.context
+    
+    def test_missing_and_unknown_keys(self):
+        """Test that missing keys use defaults and unknown keys are ignored."""
+        sm = StateMachine.from_dict({"state": "in_transit", "extra": 1})
+        assert sm.get_state() == "in_transit"
+        assert list(sm.context.utterances) == []
+        assert sm.context.pod_acknowledged is False
+    
+    def test_utterances_serialize_as_list(self):
+        """Test that to_dict emits utterances as a plain (JSON-friendly) list."""
+        sm = StateMachine()
+        sm.add_utterance("agent", "Hi")
+        assert sm.to_dict()["utterances"] == [{"role": "agent", "content": "Hi"}]
+    
+    def test_utterances_bounded(self):
+        """Test that only the most recent utterances are kept."""
+        sm = StateMachine.from_dict({"utterances": [{"role": "user", "content": "old"}]})
+        for i in range(MAX_CONTEXT_UTTERANCES):
+            sm.add_utterance("user", str(i))
+        assert len(sm.context.utterances) == MAX_CONTEXT_UTTERANCES
+        assert sm.context.utterances[0]["content"] == "0"
+        assert sm.context.dropped_utterances == 1
+    
+    def test_dropped_utterances_logged_once(self, caplog):
+        """Test that hitting the bound logs a warning once and counts every drop."""
+        sm = StateMachine()
+        with caplog.at_level(logging.WARNING, logger="app.core.state_machine"):
+            for i in range(MAX_CONTEXT_UTTERANCES + 3):
+                sm.add_utterance("user", str(i))
+        assert len(caplog.records) == 1
+        assert sm.context.dropped_utterances == 3
+    
+    def test_null_utterances_tolerated(self):
+        """Test that a stored context with null utterances loads as an empty history."""
+        sm = StateMachine.from_dict({"utterances": None})
+        assert list(sm.context.utterances) == []
+    
+    def test_dropped_count_survives_round_trip(self):
+        """Test that an oversized stored history is trimmed and counted on load."""
+        utterances = [{"role": "user", "content": str(i)} for i in range(MAX_CONTEXT_UTTERANCES + 2)]
+        sm = StateMachine.from_dict({"utterances": utterances})
+        assert sm.context.dropped_utterances == 2
+        assert StateMachine.from_dict(sm.to_dict()).context.dropped_utterances == 2
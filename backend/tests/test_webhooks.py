@@ -0,0 +1,134 @@
+"""
+Unit tests for Retell webhook handling:
+- call_ended completion failures are surfaced so Retell redelivers
+- redelivered events are only short-circuited after their writes succeeded
+"""
+
+import orjson
+import pytest
+from unittest.mock import MagicMock
+from fastapi import BackgroundTasks, HTTPException
+
+from app.webhooks.retell import (
+    _call_cache,
+    _processed_events,
+    retell_webhook,
+)
+
+
+def _body(event, **call):
+    """Build a raw webhook body in Retell's nested shape."""
+    return orjson.dumps({"event": event, "call": {"call_id": "retell-1", **call}})
+
+
+@pytest.fixture
+def db():
+    """Mock Supabase client whose call lookup finds one call."""
+    client = MagicMock()
+    lookup = client.table.return_value.select.return_value.eq.return_value.limit.return_value
+    lookup.execute.return_value = MagicMock(
+        data=[{"id": "call-1", "agent_config_id": None, "agent_configs": None}]
+    )
+    return client
+
+
+@pytest.fixture(autouse=True)
+def clear_webhook_caches():
+    """Ensure each test starts with empty lookup and dedup caches."""
+    _call_cache.clear()
+    _processed_events.clear()
+    yield
+    _call_cache.clear()
+    _processed_events.clear()
+
+
+class TestCallEnded:
+    """Tests for call_ended completion writes."""
+
+    @pytest.mark.asyncio
+    async def test_failed_completion_returns_5xx(self, db):
+        """Test that a failed completion RPC fails the webhook instead of acking it."""
+        db.rpc.return_value.execute.side_effect = RuntimeError("database unavailable")
+
+        with pytest.raises(HTTPException) as exc_info:
+            await retell_webhook(BackgroundTasks(), _body("call_ended", transcript="hi"), db)
+
+        assert exc_info.value.status_code == 500
+        assert not _processed_events
+
+    @pytest.mark.asyncio
+    async def test_redelivery_after_failure_writes_again(self, db):
+        """Test that Retell's retry after a failure runs the completion again."""
+        db.rpc.return_value.execute.side_effect = [RuntimeError("database unavailable"), None]
+        body = _body("call_ended", transcript="hi")
+
+        with pytest.raises(HTTPException):
+            await retell_webhook(BackgroundTasks(), body, db)
+        response = await retell_webhook(BackgroundTasks(), body, db)
+
+        assert response.data["status"] == "processed"
+        assert db.rpc.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_duplicate_after_success_skips_write(self, db):
+        """Test that a redelivery of a completed call_ended doesn't write again."""
+        body = _body("call_ended", transcript="hi")
+
+        await retell_webhook(BackgroundTasks(), body, db)
+        await retell_webhook(BackgroundTasks(), body, db)
+
+        assert db.rpc.call_count == 1
+
+
+class TestCallStarted:
+    """Tests for the deferred call_started update."""
+
+    @pytest.mark.asyncio
+    async def test_not_remembered_until_update_succeeds(self, db):
+        """Test that the event is only deduplicated once its deferred update ran."""
+        background_tasks = BackgroundTasks()
+        body = _body("call_started", metadata={"internal_call_id": "call-1"})
+
+        await retell_webhook(background_tasks, body, db)
+        assert not _processed_events
+
+        await background_tasks()
+        assert ("retell-1", "call_started") in _processed_events
+
+    @pytest.mark.asyncio
+    async def test_update_skips_ended_calls(self, db):
+        """Test that a late call_started update can't move an ended call back to in_progress."""
+        background_tasks = BackgroundTasks()
+        body = _body("call_started", metadata={"internal_call_id": "call-1"})
+
+        await retell_webhook(background_tasks, body, db)
+        await background_tasks()
+
+        update = db.table.return_value.update.return_value.eq.return_value
+        update.in_.assert_called_once_with("status", ["pending", "in_progress"])
+
+    @pytest.mark.asyncio
+    async def test_failed_update_not_remembered(self, db):
+        """Test that a failed deferred update leaves the event open for redelivery."""
+        update = db.table.return_value.update.return_value.eq.return_value.in_.return_value
+        update.execute.side_effect = RuntimeError("database unavailable")
+        background_tasks = BackgroundTasks()
+        body = _body("call_started", metadata={"internal_call_id": "call-1"})
+
+        await retell_webhook(background_tasks, body, db)
+        await background_tasks()
+
+        assert not _processed_events
+
+
+class TestCallLookup:
+    """Tests for caching retell_call_id lookups."""
+
+    @pytest.mark.asyncio
+    async def test_lookup_cached_after_first_fetch(self, db):
+        """Test that a second event for the same call doesn't query the call again."""
+        await retell_webhook(BackgroundTasks(), _body("call_ended"), db)
+        await retell_webhook(BackgroundTasks(), _body("call_analyzed"), db)
+
+        assert _call_cache["retell-1"]["id"] == "call-1"
+        assert db.table.return_value.select.call_count == 1
@@ -9,6 +9,7 @@ import type {
   AgentConfigCreate, 
   AgentConfigUpdate,
   Call,
+  CallPage,
   CallCreate,
   CallWithDetails,
   CallTriggerRequest,
@@ -123,6 +124,16 @@ export const configsApi = {
     const response = await api.post<AgentConfig>(`/configs/retell/sync?scenario_type=${scenarioType}`);
     return response.data;
   },
+
+  /**
+   * Sync configuration FROM Retell AI for every scenario type in one request
+   */
+  syncAllFromRetell: async (activeScenario?: ScenarioType): Promise<AgentConfig[]> => {
+    const response = await api.post<AgentConfig[]>('/configs/retell/sync-all', null, {
+      params: activeScenario ? { active_scenario: activeScenario } : undefined,
+    });
+    return response.data;
+  },
 };
 
 // =============================================================================
@@ -135,8 +146,8 @@ export const callsApi = {
    */
   getAll: async (status?: CallStatus): Promise<Call[]> => {
     const params = status ? { status } : {};
-    const response = await api.get<Call[]>('/calls', { params });
-    return response.data;
+    const response = await api.get<CallPage>('/calls', { params });
+    return response.data.data;
   },
 
   /**
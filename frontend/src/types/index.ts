@@ -188,6 +188,11 @@ export interface ApiError {
   detail: string;
 }
 
+export interface CallPage {
+  data: Call[];
+  next_cursor: string | null;
+}
+
 // =============================================================================
 // Preset Templates
 // =============================================================================
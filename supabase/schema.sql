@@ -124,10 +124,51 @@ CREATE TABLE IF NOT EXISTS structured_summaries (
 -- Indexes for Performance
 -- -----------------------------------------------------------------------------
 
-CREATE INDEX IF NOT EXISTS idx_calls_status ON calls(status);
-CREATE INDEX IF NOT EXISTS idx_calls_created_at ON calls(created_at DESC);
+-- Composite indexes match list_calls' ORDER BY created_at DESC, id DESC (with and
+-- without a status filter), so keyset pages are index range scans with no sort step
+CREATE INDEX IF NOT EXISTS idx_calls_status_created_at ON calls(status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_calls_created_at ON calls(created_at DESC, id DESC);
+-- Recent completed calls: WHERE status = 'completed' ORDER BY ended_at DESC NULLS
+-- LAST, id DESC. Replaces the earlier idx_calls_status_ended_at, whose order
+-- (NULLS FIRST, no id) couldn't serve that query without a sort
+DROP INDEX IF EXISTS idx_calls_status_ended_at;
+CREATE INDEX IF NOT EXISTS idx_calls_status_ended_at_id
+    ON calls(status, ended_at DESC NULLS LAST, id DESC);
 CREATE INDEX IF NOT EXISTS idx_agent_configs_scenario ON agent_configs(scenario_type);
-CREATE INDEX IF NOT EXISTS idx_agent_configs_active ON agent_configs(is_active);
+-- Partial unique index: the active-config lookup is a single index fetch, and
+-- the database enforces that at most one config is active at a time. The earlier
+-- two-request activation (deactivate others, then activate) could leave several
+-- configs active, so keep only the most recently updated one active first
+UPDATE agent_configs SET is_active = false
+WHERE is_active
+  AND id <> (
+      SELECT id FROM agent_configs WHERE is_active
+      ORDER BY updated_at DESC, id DESC LIMIT 1
+  );
+CREATE UNIQUE INDEX IF NOT EXISTS idx_agent_configs_single_active
+    ON agent_configs(is_active) WHERE is_active;
+-- One transcript per call: a redelivered call_ended webhook doesn't add a
+-- second row (complete_call_with_transcript inserts ON CONFLICT DO NOTHING).
+-- Replaces the earlier non-unique idx_transcripts_call_id. Redelivered webhooks
+-- could store a call's transcript more than once, so keep only the newest row
+-- per call before the unique index is built
+DROP INDEX IF EXISTS idx_transcripts_call_id;
+DELETE FROM transcripts t
+USING transcripts newer
+WHERE t.call_id = newer.call_id
+  AND (t.created_at, t.id) < (newer.created_at, newer.id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transcripts_call_id_unique ON transcripts(call_id);
+-- One summary per call: post-processing upserts ON CONFLICT (call_id). Replaces
+-- the earlier non-unique idx_structured_summaries_call_id. The earlier
+-- select-then-insert (and redelivered call_analyzed webhooks) could store a
+-- call's summary more than once, so keep only the newest row per call first
+DROP INDEX IF EXISTS idx_structured_summaries_call_id;
+DELETE FROM structured_summaries t
+USING structured_summaries newer
+WHERE t.call_id = newer.call_id
+  AND (t.created_at, t.id) < (newer.created_at, newer.id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_structured_summaries_call_id_unique
+    ON structured_summaries(call_id);
 
 -- -----------------------------------------------------------------------------
 -- Updated At Trigger
@@ -151,6 +192,162 @@ CREATE TRIGGER update_calls_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- -----------------------------------------------------------------------------
+-- Single Active Config
+-- -----------------------------------------------------------------------------
+-- Only one config may be active at a time. Writing a config with
+-- is_active = true deactivates every other config in the same statement,
+-- so the application never issues a separate "deactivate others" UPDATE.
+--
+-- Writes that may activate a config take a transaction-scoped advisory lock
+-- first, so concurrent activations run one after another (last writer wins)
+-- instead of the loser failing on the single-active unique index. The lock is
+-- taken by a statement-level trigger, i.e. before the statement locks any row;
+-- taking it per row would let two writers each hold a row lock the other needs.
+
+CREATE OR REPLACE FUNCTION lock_config_activation()
+RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('agent_configs_activation'));
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION lock_config_activation_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM lock_config_activation();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER lock_config_activation
+    BEFORE INSERT OR UPDATE OF is_active ON agent_configs
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION lock_config_activation_trigger();
+
+CREATE OR REPLACE FUNCTION enforce_single_active_config()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Runs before the row is written, so the unique index never sees two active rows
+    UPDATE agent_configs SET is_active = false WHERE is_active AND id <> NEW.id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER enforce_single_active_config
+    BEFORE INSERT OR UPDATE OF is_active ON agent_configs
+    FOR EACH ROW
+    WHEN (NEW.is_active)
+    EXECUTE FUNCTION enforce_single_active_config();
+
+-- Writes one config per payload (one per scenario_type) in a single call:
+-- updates the scenario's existing config, preferring the currently active one,
+-- or inserts a new config. Exactly one synced config ends up active: the one
+-- for p_active_scenario, else the previously active scenario, else
+-- p_default_scenario.
+CREATE OR REPLACE FUNCTION sync_scenario_configs(
+    p_payloads JSONB,
+    p_default_scenario TEXT,
+    p_active_scenario TEXT DEFAULT NULL
+)
+RETURNS SETOF agent_configs AS $$
+DECLARE
+    prev_active agent_configs;
+    active_scenario TEXT;
+    payload JSONB;
+    target_id UUID;
+    synced agent_configs;
+BEGIN
+    -- Hold the activation lock for the whole sync (re-entrant for the trigger)
+    PERFORM lock_config_activation();
+
+    SELECT * INTO prev_active FROM agent_configs WHERE is_active LIMIT 1;
+
+    active_scenario := COALESCE(p_active_scenario, prev_active.scenario_type);
+    IF active_scenario IS NULL OR NOT EXISTS (
+        SELECT 1 FROM jsonb_array_elements(p_payloads) e
+        WHERE e->>'scenario_type' = active_scenario
+    ) THEN
+        active_scenario := p_default_scenario;
+    END IF;
+
+    -- Deactivate everything up front; the enforce_single_active_config trigger
+    -- keeps the one activated below unique
+    UPDATE agent_configs SET is_active = false WHERE is_active;
+
+    FOR payload IN SELECT * FROM jsonb_array_elements(p_payloads) LOOP
+        payload := payload || jsonb_build_object(
+            'is_active', payload->>'scenario_type' = active_scenario
+        );
+
+        SELECT id INTO target_id FROM agent_configs
+        WHERE scenario_type = payload->>'scenario_type'
+        ORDER BY (id IS NOT DISTINCT FROM prev_active.id) DESC, created_at
+        LIMIT 1
+        FOR UPDATE;
+
+        IF FOUND THEN
+            UPDATE agent_configs c
+            SET (
+                name, description, scenario_type, system_prompt, initial_message,
+                enable_backchanneling, enable_filler_words, interruption_sensitivity, is_active
+            ) = (
+                SELECT
+                    r.name, r.description, r.scenario_type, r.system_prompt, r.initial_message,
+                    r.enable_backchanneling, r.enable_filler_words, r.interruption_sensitivity, r.is_active
+                FROM jsonb_populate_record(c, payload) r
+            )
+            WHERE c.id = target_id
+            RETURNING c.* INTO synced;
+        ELSE
+            INSERT INTO agent_configs (
+                name, description, scenario_type, system_prompt, initial_message,
+                enable_backchanneling, enable_filler_words, interruption_sensitivity, is_active
+            )
+            SELECT
+                r.name, r.description, r.scenario_type, r.system_prompt, r.initial_message,
+                COALESCE(r.enable_backchanneling, true),
+                COALESCE(r.enable_filler_words, true),
+                COALESCE(r.interruption_sensitivity, 0.5),
+                r.is_active
+            FROM jsonb_populate_record(NULL::agent_configs, payload) r
+            RETURNING * INTO synced;
+        END IF;
+
+        RETURN NEXT synced;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- -----------------------------------------------------------------------------
+-- Call Completion
+-- -----------------------------------------------------------------------------
+-- Marks a call completed and stores its transcript in one transaction, so the
+-- call_ended webhook makes one round trip and a call never ends up completed
+-- without its transcript. The transcript is skipped when both parts are NULL,
+-- and when the call already has one (redelivered webhook).
+
+CREATE OR REPLACE FUNCTION complete_call_with_transcript(
+    p_call_id UUID,
+    p_ended_at TIMESTAMPTZ,
+    p_duration_seconds INTEGER,
+    p_raw_transcript TEXT DEFAULT NULL,
+    p_utterances JSONB DEFAULT NULL
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE calls
+    SET status = 'completed', ended_at = p_ended_at, duration_seconds = p_duration_seconds
+    WHERE id = p_call_id;
+
+    IF p_raw_transcript IS NOT NULL OR p_utterances IS NOT NULL THEN
+        INSERT INTO transcripts (call_id, raw_transcript, utterances)
+        VALUES (p_call_id, p_raw_transcript, COALESCE(p_utterances, '[]'::jsonb))
+        ON CONFLICT (call_id) DO NOTHING;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
 -- -----------------------------------------------------------------------------
 -- Row Level Security (RLS) - Disabled for simplicity
 -- -----------------------------------------------------------------------------